@@ -0,0 +1,224 @@
+# Benchmark de la API de películas
+# ---------------------------------
+# Genera catálogos sintéticos con el mismo esquema que dataset/netflix_titles.csv (1x y 10x su tamaño por defecto),
+# llama a cada ruta de la API dentro del mismo proceso a través de la aplicación ASGI (sin red ni servidor)
+# y muestra cuántas peticiones por segundo atiende y su latencia p50/p95/p99.
+#
+# Uso (desde la carpeta del proyecto):
+#   python benchmarks/bench.py                      -> ejecuta y compara con benchmarks/baseline.json si existe
+#   python benchmarks/bench.py --scales 1 10 100    -> elegir los tamaños (100x tarda varios minutos)
+#   python benchmarks/bench.py --save-baseline      -> guarda los resultados como nueva referencia
+#
+# Si alguna ruta es más lenta que la referencia (p95 por encima de la tolerancia) termina con código 1.
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from urllib.parse import urlencode
+
+import numpy as np
+
+# main.py usa rutas relativas a la carpeta del proyecto (./dataset/...), así que trabajamos desde ahí
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT)
+sys.path.insert(0, ROOT)
+
+import main  # noqa: E402
+from store import MovieStore  # noqa: E402
+
+BASELINE_PATH = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+# Palabras para las consultas del chatbot: algunas muy frecuentes (como en el tráfico real) y otras raras
+QUERY_WORDS = ['love', 'christmas', 'action', 'comedy', 'war', 'family', 'dead', 'king', 'girl', 'night',
+               'world', 'life', 'story', 'secret', 'murder', 'dream', 'house', 'school', 'music', 'island']
+
+
+# Crea un catálogo sintético "scale" veces más grande que el real.
+# La primera copia es el catálogo original; las demás mezclan títulos, descripciones, géneros, años y clasificaciones
+# de películas reales al azar, para conservar la distribución de palabras y valores del dataset.
+def synthetic_catalog(records, scale, seed=42):
+    rng = random.Random(seed)
+    movies = list(records)
+    for copy in range(1, scale):
+        for r in records:
+            other = records[rng.randrange(len(records))]
+            extra = rng.choice(records[rng.randrange(len(records))]['title'].split() or [''])
+            movies.append({
+                'id': f"{r['id']}x{copy}",
+                'title': f"{r['title']} {extra}".strip(),
+                'year': other['year'],
+                'category': records[rng.randrange(len(records))]['category'],
+                'overview': other['overview'],
+                'rating': records[rng.randrange(len(records))]['rating'],
+                'type': other['type'],
+                'country': records[rng.randrange(len(records))]['country'],
+                'cast': records[rng.randrange(len(records))]['cast'],
+                'date_added': other['date_added'],
+            })
+    return movies
+
+
+# Hace una petición HTTP a la aplicación ASGI directamente, sin servidor, y devuelve (estado, cuerpo)
+async def asgi_request(app, method, path, params=None, body=None, headers=None):
+    raw_body = json.dumps(body).encode('utf-8') if body is not None else b''
+    header_list = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in (headers or {}).items()]
+    if body is not None:
+        header_list.append((b'content-type', b'application/json'))
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+        'scheme': 'http', 'path': path, 'raw_path': path.encode('utf-8'),
+        'query_string': urlencode(params or {}, doseq=True).encode('utf-8'),
+        'headers': header_list, 'client': ('127.0.0.1', 50000), 'server': ('127.0.0.1', 8000), 'root_path': '',
+    }
+    sent = False
+    status, chunks = None, []
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': raw_body, 'more_body': False}
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body':
+            chunks.append(message.get('body', b''))
+
+    await app(scope, receive, send)
+    return status, b''.join(chunks)
+
+
+# Escenarios: nombre -> función que, dada la posición de la petición, devuelve (método, ruta, parámetros, cuerpo)
+def scenarios(movies, scale, rng):
+    ids = [m['id'] for m in movies]
+    genres = sorted({g for m in movies[:len(movies) // scale] for g in main.parse_genres(m['category'])})
+    result = {
+        'GET /movies?limit=100': lambda i: ('GET', '/movies', {'limit': 100, 'offset': rng.randrange(len(ids))}, None),
+        'GET /movies?limit=100&fields=id,title': lambda i: ('GET', '/movies', {'limit': 100, 'fields': 'id,title',
+                                                                        'offset': rng.randrange(len(ids))}, None),
+        'GET /movies/{id}': lambda i: ('GET', f'/movies/{rng.choice(ids)}', None, None),
+        'POST /movies/batch': lambda i: ('POST', '/movies/batch', None, rng.sample(ids, 50)),
+        'GET /movies/by_category (1)': lambda i: ('GET', '/movies/by_category/', {'category': rng.choice(genres)}, None),
+        'GET /movies/by_category (and)': lambda i: ('GET', '/movies/by_category/',
+                                                    {'category': rng.sample(genres, 2), 'mode': 'and'}, None),
+        'GET /chatbot': lambda i: ('GET', '/chatbot', {'query': rng.choice(QUERY_WORDS)}, None),
+        'GET /chatbot (token)': lambda i: ('GET', '/chatbot', {'query': rng.choice(QUERY_WORDS), 'match': 'token'}, None),
+        'GET /chatbot (k=10)': lambda i: ('GET', '/chatbot', {'query': ' '.join(rng.sample(QUERY_WORDS, 2)), 'k': 10}, None),
+    }
+    countries = ['United States', 'India', 'United Kingdom', 'Canada', 'France', 'Japan', 'Spain', 'Mexico']
+    result['GET /movies/query (facets)'] = lambda i: ('GET', '/movies/query/', {
+        'type': rng.choice(['Movie', 'TV Show']), 'country': rng.sample(countries, 2), 'genre': rng.choice(genres),
+        'year_from': rng.randrange(1990, 2020), 'added_from': '2018-01-01', 'limit': 50}, None)
+    # Búsqueda aproximada con un título real al que le falta una letra
+    def misspelled(i):
+        title = rng.choice(movies)['title']
+        j = rng.randrange(len(title))
+        return ('GET', '/search', {'q': title[:j] + title[j + 1:]}, None)
+    result['GET /search'] = misspelled
+    # Autocompletado con los primeros 1 a 6 caracteres de una palabra de la consulta, como al escribir
+    result['GET /autocomplete'] = lambda i: ('GET', '/autocomplete',
+                                             {'prefix': rng.choice(QUERY_WORDS)[:rng.randint(1, 6)]}, None)
+    if scale == 1:
+        result['GET /movies/{id}/similar'] = lambda i: ('GET', f'/movies/{rng.choice(ids)}/similar', None, None)
+    # El catálogo completo solo se mide en los tamaños chicos: a 100x la respuesta pesa cientos de MB
+    if scale <= 10:
+        result['GET /movies'] = lambda i: ('GET', '/movies', None, None)
+    return result
+
+
+# Ejecuta un escenario: "requests" peticiones con "concurrency" peticiones simultáneas.
+# Antes de medir hace una petición sola para llenar las cachés de respuestas: si no, las primeras peticiones
+# simultáneas fallan todas en la caché a la vez (por ejemplo GET /movies) y el p95/p99 mide la construcción
+# de la respuesta en lugar del caso normal.
+async def run_scenario(app, build, requests, concurrency):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    method, path, params, body = build(-1)
+    await asgi_request(app, method, path, params, body)
+
+    async def one(i):
+        method, path, params, body = build(i)
+        async with semaphore:
+            start = time.perf_counter()
+            status, _ = await asgi_request(app, method, path, params, body)
+            latencies.append(time.perf_counter() - start)
+        if status >= 500:
+            raise RuntimeError(f"{method} {path} respondió {status}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    return {'rps': round(requests / elapsed, 1), 'p50_ms': round(float(p50), 3),
+            'p95_ms': round(float(p95), 3), 'p99_ms': round(float(p99), 3)}
+
+
+def run(scales, requests, concurrency, seed):
+    records = main.read_movies_csv()
+    results = {}
+    for scale in scales:
+        movies = synthetic_catalog(records, scale, seed)
+        start = time.perf_counter()
+        # Reemplazamos el catálogo de la API igual que lo hace una recarga
+        main.catalog = main.build_catalog(MovieStore.from_records(movies, hidden=main.HIDDEN_COLUMNS))
+        build_ms = (time.perf_counter() - start) * 1000
+        print(f"\nCatálogo {scale}x: {len(movies)} títulos (índices construidos en {build_ms:.0f} ms)")
+        # La tabla de títulos parecidos compara todas las películas contra todas: solo la calculamos en el tamaño real
+        if scale == 1:
+            start = time.perf_counter()
+            main.build_similar(main.catalog)
+            print(f"Tabla de títulos parecidos calculada en {(time.perf_counter() - start) * 1000:.0f} ms")
+        print(f"{'escenario':40} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+
+        rng = random.Random(seed)
+        for name, build in scenarios(movies, scale, rng).items():
+            # Las peticiones al catálogo completo son pesadas: hacemos menos
+            n = max(requests // 20, 5) if name == 'GET /movies' else requests
+            stats = asyncio.run(run_scenario(main.app, build, n, concurrency))
+            results[f"{scale}x {name}"] = stats
+            print(f"{name:40} {stats['rps']:>10} {stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9}")
+    return results
+
+
+# Compara con la referencia guardada y devuelve la lista de escenarios más lentos que lo tolerado
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, stats in results.items():
+        reference = baseline.get(name)
+        if reference and stats['p95_ms'] > reference['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {stats['p95_ms']} ms (referencia {reference['p95_ms']} ms)")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark de la API de películas con catálogos sintéticos")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10], help="tamaños del catálogo (múltiplos del real)")
+    parser.add_argument('--requests', type=int, default=500, help="peticiones por escenario")
+    parser.add_argument('--concurrency', type=int, default=8, help="peticiones simultáneas")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--tolerance', type=float, default=0.2, help="margen permitido sobre el p95 de referencia (0.2 = 20%%)")
+    parser.add_argument('--save-baseline', action='store_true', help="guardar los resultados como nueva referencia")
+    args = parser.parse_args()
+
+    results = run(args.scales, args.requests, args.concurrency, args.seed)
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\nReferencia guardada en {BASELINE_PATH}")
+    elif os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegresiones respecto a la referencia:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print("\nSin regresiones respecto a la referencia.")
@@ -0,0 +1,33 @@
+"""
+Limpieza del dataset de Netflix, compartida por el análisis exploratorio (eda/eda.py) y la API (main.py).
+"""
+
+import pandas as pd
+
+
+# Recibe el DataFrame leído del CSV y devuelve una copia limpia con columnas nuevas:
+# year_added, month_added, duration_numeric y duration_unit
+def clean_titles(df):
+    # Copia del dataframe para no afectar el original
+    df_clean = df.copy()
+
+    # Convertir date_added a datetime ("September 25, 2021"); algunas fechas traen espacios al inicio,
+    # los quitamos para que no queden como fechas vacías
+    df_clean['date_added'] = pd.to_datetime(df_clean['date_added'].str.strip(), format='%B %d, %Y', errors='coerce')
+
+    # Extraer año y mes de date_added
+    df_clean['year_added'] = df_clean['date_added'].dt.year
+    df_clean['month_added'] = df_clean['date_added'].dt.month
+
+    # Tratamiento de valores faltantes (corregido para evitar FutureWarning)
+    df_clean = df_clean.assign(
+        director=df_clean['director'].fillna('Sin director'),
+        cast=df_clean['cast'].fillna('Sin elenco'),
+        country=df_clean['country'].fillna('País desconocido')
+    )
+
+    # Extraer la duración numérica y la unidad (corregido para evitar SyntaxWarning)
+    df_clean['duration_numeric'] = df_clean['duration'].str.extract(r'(\d+)').astype(float)
+    df_clean['duration_unit'] = df_clean['duration'].str.extract(r'(\D+)').fillna('')
+    df_clean['duration_unit'] = df_clean['duration_unit'].str.strip()
+    return df_clean
@@ -1,10 +1,20 @@
 # Importación de librerías necesarias
 import pandas as pd
 import numpy as np
+from scipy import sparse
+import matplotlib
+matplotlib.use('Agg')  # Solo guardamos imágenes, no abrimos ventanas (necesario en los procesos paralelos)
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
 import re
+import os
+import json
+import pickle
+import hashlib
+import inspect
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
 # Configuración de visualización
 plt.style.use('fivethirtyeight')
@@ -15,109 +25,243 @@ pd.set_option('display.max_columns', None)
 pd.set_option('display.max_rows', 100)
 pd.set_option('display.width', 1000)
 
-
-def print_hi(name):
-    # Use a breakpoint in the code line below to debug your script.
-    print(f'Hi, {name}')  # Press Ctrl+F8 to toggle the breakpoint.
-
-    # 1. CARGA Y EXPLORACIÓN INICIAL DE DATOS
-    # ---------------------------------------
-    print("1. CARGA Y EXPLORACIÓN INICIAL DE DATOS")
-    print("-" * 50)
-
+# Rutas del proyecto (relativas a este archivo, así el script funciona desde cualquier carpeta)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASET_PATH = os.path.join(BASE_DIR, 'dataset', 'netflix_titles.csv')
+IMAGES_DIR = os.path.join(BASE_DIR, 'imagenes')
+# El modo streaming (--chunksize) guarda sus figuras aparte: sus datos son solo conteos y no deben pisar las del
+# análisis completo
+STREAMING_IMAGES_DIR = os.path.join(IMAGES_DIR, 'streaming')
+# La limpieza de los datos vive en cleaning.py, en la carpeta del proyecto, porque también la usa la API
+sys.path.insert(0, BASE_DIR)
+from cleaning import clean_titles  # noqa: E402
+
+# Caché en disco del dataset limpio, los agregados y las huellas de las figuras ya generadas
+CACHE_DIR = os.path.join(BASE_DIR, 'eda', '.cache')
+# Cambiar este número invalida la caché cuando cambia la forma de limpiar o agregar los datos
+CACHE_VERSION = 3
+
+
+# El análisis se divide en etapas independientes:
+#   1. load_clean: carga y limpieza del CSV
+#   2. compute_aggregates: todos los conteos y tablas que se imprimen o grafican
+#   3. una función por figura (fig_*), que solo recibe los datos que necesita
+# Las etapas 1 y 2 se guardan en disco según la huella del dataset, y las figuras se dibujan en paralelo
+# en varios procesos, saltando las que ya existen y cuyos datos no cambiaron.
+
+
+# Huella del contenido del CSV: si el archivo cambia, la caché deja de servir
+def dataset_hash(path=DATASET_PATH):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return f"{digest.hexdigest()[:16]}-v{CACHE_VERSION}"
+
+
+# Devuelve el resultado guardado en disco para esta huella o lo calcula y lo guarda
+def cached(name, key, compute):
+    path = os.path.join(CACHE_DIR, f'{name}-{key}.pkl')
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    result = compute()
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(path + '.tmp', 'wb') as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + '.tmp', path)
+    return result
+
+
+# 1. CARGA Y LIMPIEZA
+def load_clean(path=DATASET_PATH):
     # Cargar el dataset
-    df = pd.read_csv('../dataset/netflix_titles.csv')
-
-    # Información básica del dataset
-    print("\n• Información básica del dataset:")
-    print(f"Dimensiones del dataset: {df.shape[0]} filas x {df.shape[1]} columnas")
-    print("\n• Primeras 5 filas del dataset:")
-    print(df.head())
-
-    # Información de las columnas
-    print("\n• Información de tipos de datos:")
-    print(df.info())
-
-    # Estadísticas descriptivas
-    print("\n• Estadísticas descriptivas:")
-    print(df.describe(include='all'))
-
-    # 2. ANÁLISIS DE VALORES FALTANTES
-    # --------------------------------
-    print("\n\n2. ANÁLISIS DE VALORES FALTANTES")
-    print("-" * 50)
-
-    # Calcular valores faltantes por columna
-    missing_values = df.isnull().sum()
-    missing_percentage = (missing_values / len(df)) * 100
-
-    missing_data = pd.DataFrame({
+    df = pd.read_csv(path)
+
+    # Limpieza compartida con la API (cleaning.py)
+    df_clean = clean_titles(df)
+    return df, df_clean
+
+
+# Matriz dispersa de indicadores (one-hot) para una columna con varios valores separados por comas:
+# fila = título, columna = valor (país, género, director); vale 1 si el título tiene ese valor.
+# Se construye una sola vez y de ella salen todos los conteos con operaciones de matrices.
+def one_hot(series, exclude=()):
+    series = series.reset_index(drop=True)
+    values = series.str.split(', ').explode().str.strip()
+    values = values[values.notna() & ~values.isin(exclude)]
+    codes, labels = pd.factorize(values)
+    matrix = sparse.csr_matrix((np.ones(len(codes)), (values.index.to_numpy(), codes)), shape=(len(series), len(labels)))
+    # Un valor repetido en el mismo título cuenta una sola vez
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix, pd.Index(labels)
+
+
+# Cantidad de títulos por columna de la matriz, con los mismos nombres que daría value_counts
+def column_counts(matrix, labels, name):
+    return pd.Series(np.asarray(matrix.sum(axis=0)).ravel(), index=labels.rename(name), name='count')
+
+
+# Conteos de un bloque de títulos. Todos se pueden sumar entre bloques, así el análisis
+# funciona igual con el dataset completo o leyéndolo por partes (modo streaming).
+def additive_aggregates(df, df_clean):
+    counts = {'rows': len(df), 'missing_values': df.isnull().sum()}
+
+    # Los conteos quedan en orden de aparición (sort=False); top() los ordena al final, así los empates
+    # se resuelven igual leyendo el dataset completo o por bloques
+    counts['types'] = df_clean['type'].value_counts(sort=False)
+    counts['release_years'] = df_clean['release_year'].value_counts()
+    counts['years_added'] = df_clean['year_added'].value_counts()
+    counts['content_by_year'] = df_clean.groupby(['release_year', 'type']).size().unstack().fillna(0)
+    recent_df = df_clean[df_clean['year_added'] >= 2015]  # Últimos años
+    counts['heatmap'] = pd.crosstab(recent_df['year_added'], recent_df['month_added'])
+    counts['ratings'] = df_clean['rating'].value_counts(sort=False)
+
+    # Indicadores de países, géneros y directores (excluimos 'Sin director')
+    countries, country_labels = one_hot(df_clean['country'])
+    genres, genre_labels = one_hot(df_clean['listed_in'])
+    directors, director_labels = one_hot(df_clean['director'], exclude=['Sin director'])
+    counts['countries'] = column_counts(countries, country_labels, 'country')
+    counts['genres'] = column_counts(genres, genre_labels, 'listed_in')
+    counts['directors'] = column_counts(directors, director_labels, 'director')
+
+    # Títulos por año y género: (indicador de año)^T x (indicador de género)
+    years, year_labels = one_hot(df_clean['release_year'].astype(str))
+    counts['genres_by_year'] = pd.DataFrame((years.T @ genres).toarray(),
+                                            index=pd.Index(year_labels.astype(int), name='release_year'),
+                                            columns=genre_labels)
+
+    # Duración: temporadas de las series y momentos de la duración de las películas
+    movies = df_clean.loc[df_clean['type'] == 'Movie', 'duration_numeric'].dropna()
+    counts['seasons'] = df_clean.loc[df_clean['type'] == 'TV Show', 'duration_numeric'].value_counts()
+    counts['movie_moments'] = pd.Series({'count': len(movies), 'sum': movies.sum(), 'sumsq': (movies ** 2).sum()})
+    counts['movie_min'] = movies.min()
+    counts['movie_max'] = movies.max()
+    return counts
+
+
+# Suma dos conteos conservando el orden de aparición de las etiquetas: primero las de a y luego las nuevas de b.
+# (Series.add ordenaría las etiquetas alfabéticamente y cambiaría el orden de los empates en top)
+def add_counts(a, b):
+    index = a.index.union(b.index, sort=False)
+    if isinstance(a, pd.DataFrame):
+        columns = a.columns.union(b.columns, sort=False)
+        return a.reindex(index=index, columns=columns, fill_value=0) + b.reindex(index=index, columns=columns, fill_value=0)
+    return a.reindex(index, fill_value=0) + b.reindex(index, fill_value=0)
+
+
+# Suma los conteos de dos bloques
+def merge_aggregates(a, b):
+    merged = {}
+    for key, value in a.items():
+        if key == 'movie_min':
+            merged[key] = np.fmin(value, b[key])
+        elif key == 'movie_max':
+            merged[key] = np.fmax(value, b[key])
+        elif isinstance(value, (pd.Series, pd.DataFrame)):
+            merged[key] = add_counts(value, b[key])
+        else:
+            merged[key] = value + b[key]
+    return merged
+
+
+# Ordena de mayor a menor conservando el orden de aparición en los empates (igual que value_counts)
+def top(series, n=None):
+    series = series.sort_values(ascending=False, kind='stable').astype(int)
+    return series if n is None else series.head(n)
+
+
+# Convierte los conteos sumados en los agregados que se imprimen o se grafican
+def finalize_aggregates(counts):
+    agg = {}
+
+    # Valores faltantes por columna
+    missing_values = counts['missing_values'].astype(int)
+    missing_percentage = (missing_values / counts['rows']) * 100
+    agg['missing_data'] = pd.DataFrame({
         'Valores Faltantes': missing_values,
         'Porcentaje (%)': missing_percentage.round(2)
     })
 
-    print("• Análisis de valores faltantes por columna:")
-    print(missing_data[missing_data['Valores Faltantes'] > 0].sort_values(by='Valores Faltantes', ascending=False))
-
-    # Visualización de valores faltantes
-    plt.figure(figsize=(12, 6))
-    sns.heatmap(df.isnull(), cbar=False, cmap='viridis', yticklabels=False)
-    plt.title('Mapa de calor de valores faltantes')
-    plt.tight_layout()
-    plt.savefig('../imagenes/valores_faltantes.png')
-
-    # 3. PREPROCESAMIENTO BÁSICO
-    # -------------------------
-    print("\n\n3. PREPROCESAMIENTO BÁSICO")
-    print("-" * 50)
-
-    # Copia del dataframe para no afectar el original
-    df_clean = df.copy()
+    # Distribución por tipo (Movie vs TV Show)
+    agg['content_distribution'] = top(counts['types'])
+
+    # Análisis temporal
+    agg['releases_by_year'] = counts['release_years'].astype(int).sort_index()
+    agg['yearly_additions'] = counts['years_added'].astype(int).sort_index()
+    agg['content_by_year'] = counts['content_by_year'].sort_index()
+    agg['heatmap_data'] = counts['heatmap'].fillna(0).astype(int).sort_index().sort_index(axis=1)
+
+    agg['country_counts'] = top(counts['countries'], 15)
+    agg['rating_counts'] = top(counts['ratings'])
+    agg['genre_counts'] = top(counts['genres'], 15)
+    agg['season_counts'] = counts['seasons'].astype(int).sort_index().head(10)
+    agg['top_directors'] = top(counts['directors'], 15)
+
+    # Evolución de los 5 géneros más comunes, solo en los años en que aparece alguno
+    top5_genres = top(counts['genres'], 5).index.tolist()
+    genre_evolution_df = counts['genres_by_year'][top5_genres].sort_index()
+    agg['top5_genres'] = top5_genres
+    agg['genre_evolution_df'] = genre_evolution_df[genre_evolution_df.sum(axis=1) > 0].astype(int)
+
+    # Estadísticas de duración de películas a partir de sus momentos (sirve también en modo streaming)
+    n, total, total_sq = counts['movie_moments'][['count', 'sum', 'sumsq']]
+    mean = total / n if n else np.nan
+    std = np.sqrt((total_sq - n * mean ** 2) / (n - 1)) if n > 1 else np.nan
+    agg['movie_duration_stats'] = pd.Series({'count': n, 'mean': mean, 'std': std,
+                                             'min': counts['movie_min'], 'max': counts['movie_max']},
+                                            name='duration_numeric')
+    return agg
+
+
+# 2. AGREGADOS: todo lo que se imprime o se grafica, calculado una sola vez
+def compute_aggregates(df, df_clean):
+    agg = finalize_aggregates(additive_aggregates(df, df_clean))
+
+    # Lo que necesita el dataset completo en memoria: mapa de valores faltantes, columnas para los gráficos
+    # de conteo, duraciones para el histograma y correlaciones
+    agg['missing_mask'] = df.isnull()
+    agg['types'] = df_clean[['type']]
+    agg['ratings'] = df_clean[['rating']]
+    agg['movie_durations'] = df_clean.loc[df_clean['type'] == 'Movie', ['duration_numeric']]
 
-    # Convertir date_added a datetime
-    df_clean['date_added'] = pd.to_datetime(df_clean['date_added'], errors='coerce')
+    # Seleccionar sólo variables numéricas
+    numeric_df = df_clean[['release_year', 'year_added', 'month_added', 'duration_numeric']].copy()
+    agg['correlation'] = numeric_df.corr()
+    return agg
 
-    # Extraer año y mes de date_added
-    df_clean['year_added'] = df_clean['date_added'].dt.year
-    df_clean['month_added'] = df_clean['date_added'].dt.month
 
-    # Tratamiento de valores faltantes (corregido para evitar FutureWarning)
-    df_clean = df_clean.assign(
-        director=df_clean['director'].fillna('Sin director'),
-        cast=df_clean['cast'].fillna('Sin elenco'),
-        country=df_clean['country'].fillna('País desconocido')
-    )
+# Modo streaming: lee el CSV por bloques de "chunksize" filas y solo guarda los conteos sumados,
+# así el análisis funciona con catálogos que no caben en memoria.
+def compute_aggregates_streaming(path=DATASET_PATH, chunksize=100_000):
+    counts = None
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        chunk_counts = additive_aggregates(chunk, clean_titles(chunk))
+        counts = chunk_counts if counts is None else merge_aggregates(counts, chunk_counts)
+    return finalize_aggregates(counts)
 
-    # Extraer la duración numérica y la unidad (corregido para evitar SyntaxWarning)
-    df_clean['duration_numeric'] = df_clean['duration'].str.extract(r'(\d+)').astype(float)
-    df_clean['duration_unit'] = df_clean['duration'].str.extract(r'(\D+)').fillna('')
-    df_clean['duration_unit'] = df_clean['duration_unit'].str.strip()
 
-    print("• Nuevas columnas creadas:")
-    print(df_clean[['date_added', 'year_added', 'month_added', 'duration', 'duration_numeric', 'duration_unit']].head())
+# 3. FIGURAS: cada función recibe solo sus datos y la ruta donde guardar la imagen
 
-    # 4. ANÁLISIS DE DISTRIBUCIÓN DE CONTENIDO
-    # ---------------------------------------
-    print("\n\n4. ANÁLISIS DE DISTRIBUCIÓN DE CONTENIDO")
-    print("-" * 50)
+def fig_valores_faltantes(missing_mask, path):
+    plt.figure(figsize=(12, 6))
+    sns.heatmap(missing_mask, cbar=False, cmap='viridis', yticklabels=False)
+    plt.title('Mapa de calor de valores faltantes')
+    plt.tight_layout()
+    plt.savefig(path)
 
-    # Distribución por tipo (Movie vs TV Show)
-    content_distribution = df_clean['type'].value_counts()
-    print("• Distribución por tipo de contenido:")
-    print(content_distribution)
-    print(f"Porcentaje de películas: {(content_distribution['Movie'] / len(df_clean) * 100):.2f}%")
-    print(f"Porcentaje de series: {(content_distribution['TV Show'] / len(df_clean) * 100):.2f}%")
 
-    # Visualización de la distribución por tipo (corregido para evitar FutureWarning)
+def fig_distribucion_tipos(types, path):
     plt.figure(figsize=(10, 6))
     # Asignar color explícitamente sin usar palette
-    ax = sns.countplot(x='type', data=df_clean, hue='type', legend=False)
+    ax = sns.countplot(x='type', data=types, hue='type', legend=False)
     plt.title('Distribución de Tipos de Contenido en Netflix')
     plt.xlabel('Tipo de Contenido')
     plt.ylabel('Cantidad')
 
     # Agregar etiquetas de cantidad y porcentaje
-    total = len(df_clean)
+    total = len(types)
     for p in ax.patches:
         percentage = f'{100 * p.get_height() / total:.1f}%'
         x = p.get_x() + p.get_width() / 2
@@ -125,19 +269,10 @@ def print_hi(name):
         ax.annotate(f'{int(y)}\n{percentage}', (x, y), ha='center', va='bottom')
 
     plt.tight_layout()
-    plt.savefig('../imagenes/distribucion_tipos.png')
+    plt.savefig(path)
 
-    # 5. ANÁLISIS TEMPORAL
-    # -------------------
-    print("\n\n5. ANÁLISIS TEMPORAL")
-    print("-" * 50)
-
-    # Tendencia de lanzamientos por año
-    releases_by_year = df_clean['release_year'].value_counts().sort_index()
-    print("• Top 10 años con más lanzamientos:")
-    print(releases_by_year.sort_values(ascending=False).head(10))
 
-    # Visualización de tendencia por año
+def fig_lanzamientos_por_anio(releases_by_year, path):
     plt.figure(figsize=(15, 6))
     releases_by_year.plot(kind='line', marker='o', linewidth=2)
     plt.title('Tendencia de Lanzamientos por Año')
@@ -145,28 +280,20 @@ def print_hi(name):
     plt.ylabel('Cantidad de Títulos')
     plt.grid(True, alpha=0.3)
     plt.tight_layout()
-    plt.savefig('../imagenes/lanzamientos_por_año.png')
+    plt.savefig(path)
 
-    # Distribución de contenido agregado por año
-    yearly_additions = df_clean['year_added'].value_counts().sort_index()
-    print("\n• Contenido añadido a Netflix por año:")
-    print(yearly_additions)
 
-    # Visualización de adiciones por año
+def fig_adiciones_por_anio(yearly_additions, path):
     plt.figure(figsize=(15, 6))
     yearly_additions.plot(kind='bar', color='coral')
     plt.title('Contenido Añadido a Netflix por Año')
     plt.xlabel('Año')
     plt.ylabel('Cantidad de Títulos')
     plt.tight_layout()
-    plt.savefig('../imagenes/adiciones_por_año.png')
+    plt.savefig(path)
 
-    # Evolución de tipos de contenido por año
-    content_by_year = df_clean.groupby(['release_year', 'type']).size().unstack().fillna(0)
-    print("\n• Evolución de tipos de contenido por año (muestra):")
-    print(content_by_year.tail(10))  # últimos 10 años
 
-    # Visualización de evolución por tipo y año
+def fig_evolucion_contenido(content_by_year, path):
     plt.figure(figsize=(15, 7))
     content_by_year.plot(marker='o')
     plt.title('Evolución de Tipos de Contenido por Año')
@@ -175,53 +302,33 @@ def print_hi(name):
     plt.grid(True, alpha=0.3)
     plt.legend(title='Tipo de Contenido')
     plt.tight_layout()
-    plt.savefig('../imagenes/evolucion_contenido.png')
+    plt.savefig(path)
+
 
-    # Heatmap de estrenos por mes y año
-    recent_df = df_clean[df_clean['year_added'] >= 2015].copy()  # Últimos años
-    heatmap_data = pd.crosstab(recent_df['year_added'], recent_df['month_added'])
+def fig_heatmap_estrenos(heatmap_data, path):
     plt.figure(figsize=(14, 8))
     sns.heatmap(heatmap_data, cmap='YlOrRd', annot=True, fmt='d')
     plt.title('Heatmap de Estrenos por Mes y Año (desde 2015)')
     plt.xlabel('Mes')
     plt.ylabel('Año')
     plt.tight_layout()
-    plt.savefig('../imagenes/heatmap_estrenos.png')
+    plt.savefig(path)
 
-    # 6. ANÁLISIS POR PAÍS
-    # -------------------
-    print("\n\n6. ANÁLISIS POR PAÍS")
-    print("-" * 50)
-
-    # Procesamiento para obtener todos los países (considerando que pueden estar separados por coma)
-    all_countries = df_clean['country'].str.split(', ').explode().str.strip()
-    country_counts = all_countries.value_counts().head(15)
-    print("• Top 15 países con más contenido:")
-    print(country_counts)
 
-    # Visualización de top países
+def fig_top_paises(country_counts, path):
     plt.figure(figsize=(12, 8))
     country_counts.plot(kind='barh', color='skyblue')
     plt.title('Top 15 Países con Más Contenido en Netflix')
     plt.xlabel('Cantidad de Títulos')
     plt.ylabel('País')
     plt.tight_layout()
-    plt.savefig('../imagenes/top_paises.png')
-
-    # 7. ANÁLISIS DE CLASIFICACIONES (RATINGS)
-    # --------------------------------------
-    print("\n\n7. ANÁLISIS DE CLASIFICACIONES (RATINGS)")
-    print("-" * 50)
+    plt.savefig(path)
 
-    # Distribución de clasificaciones
-    rating_counts = df_clean['rating'].value_counts()
-    print("• Distribución de clasificaciones:")
-    print(rating_counts)
 
-    # Visualización de clasificaciones (corregido para evitar FutureWarning)
+def fig_clasificaciones(ratings, rating_counts, path):
     plt.figure(figsize=(12, 8))
-    ordered_ratings = df_clean['rating'].value_counts().index
-    ax = sns.countplot(y='rating', data=df_clean, order=ordered_ratings, color='steelblue')
+    ordered_ratings = rating_counts.index
+    ax = sns.countplot(y='rating', data=ratings, order=ordered_ratings, color='steelblue')
     plt.title('Distribución de Clasificaciones de Contenido')
     plt.xlabel('Cantidad de Títulos')
     plt.ylabel('Clasificación')
@@ -231,126 +338,58 @@ def print_hi(name):
         ax.text(v + 5, i, str(v), va='center')
 
     plt.tight_layout()
-    plt.savefig('../imagenes/clasificaciones.png')
-
-    # 8. ANÁLISIS DE GÉNEROS
-    # ---------------------
-    print("\n\n8. ANÁLISIS DE GÉNEROS")
-    print("-" * 50)
+    plt.savefig(path)
 
-    # Procesamiento para obtener todos los géneros
-    all_genres = df_clean['listed_in'].str.split(', ').explode().str.strip()
-    genre_counts = all_genres.value_counts().head(15)
-    print("• Top 15 géneros en Netflix:")
-    print(genre_counts)
 
-    # Visualización de géneros
+def fig_generos(genre_counts, path):
     plt.figure(figsize=(14, 10))
     genre_counts.plot(kind='barh', color='lightseagreen')
     plt.title('Top 15 Géneros en Netflix')
     plt.xlabel('Cantidad de Títulos')
     plt.ylabel('Género')
     plt.tight_layout()
-    plt.savefig('../imagenes/generos.png')
+    plt.savefig(path)
 
-    # 9. ANÁLISIS DE DURACIÓN
-    # ----------------------
-    print("\n\n9. ANÁLISIS DE DURACIÓN")
-    print("-" * 50)
-
-    # Películas - Distribución de duración en minutos
-    movies_df = df_clean[df_clean['type'] == 'Movie'].copy()
-    print("• Estadísticas de duración de películas (minutos):")
-    print(movies_df['duration_numeric'].describe())
 
-    # Visualización de duración de películas
+def fig_duracion_peliculas(movie_durations, path):
     plt.figure(figsize=(15, 6))
-    sns.histplot(data=movies_df, x='duration_numeric', bins=30, kde=True)
+    sns.histplot(data=movie_durations, x='duration_numeric', bins=30, kde=True)
     plt.title('Distribución de Duración de Películas')
     plt.xlabel('Duración (minutos)')
     plt.ylabel('Frecuencia')
     plt.tight_layout()
-    plt.savefig('../imagenes/duracion_peliculas.png')
+    plt.savefig(path)
 
-    # Series - Distribución de temporadas
-    tvshows_df = df_clean[df_clean['type'] == 'TV Show'].copy()
-    season_counts = tvshows_df['duration_numeric'].value_counts().sort_index().head(10)
-    print("\n• Distribución de temporadas en series:")
-    print(season_counts)
 
-    # Visualización de temporadas de series
+def fig_temporadas_series(season_counts, path):
     plt.figure(figsize=(12, 6))
     season_counts.plot(kind='bar', color='purple')
     plt.title('Distribución de Temporadas en Series de Netflix')
     plt.xlabel('Número de Temporadas')
     plt.ylabel('Cantidad de Series')
     plt.tight_layout()
-    plt.savefig('../imagenes/temporadas_series.png')
-
-    # 10. ANÁLISIS DE DIRECTORES
-    # -------------------------
-    print("\n\n10. ANÁLISIS DE DIRECTORES")
-    print("-" * 50)
+    plt.savefig(path)
 
-    # Top directores con más contenido
-    # Excluimos 'Sin director' para el análisis
-    directors_df = df_clean[df_clean['director'] != 'Sin director'].copy()
-    directors = directors_df['director'].str.split(', ').explode().str.strip()
-    top_directors = directors.value_counts().head(15)
-    print("• Top 15 directores con más contenido:")
-    print(top_directors)
 
-    # Visualización de top directores
+def fig_top_directores(top_directors, path):
     plt.figure(figsize=(14, 10))
     top_directors.plot(kind='barh', color='salmon')
     plt.title('Top 15 Directores con Más Contenido en Netflix')
     plt.xlabel('Cantidad de Títulos')
     plt.ylabel('Director')
     plt.tight_layout()
-    plt.savefig('../imagenes/top_directores.png')
-
-    # 11. ANÁLISIS DE CORRELACIONES
-    # ----------------------------
-    print("\n\n11. ANÁLISIS DE CORRELACIONES")
-    print("-" * 50)
+    plt.savefig(path)
 
-    # Seleccionar sólo variables numéricas
-    numeric_df = df_clean[['release_year', 'year_added', 'month_added', 'duration_numeric']].copy()
-    correlation = numeric_df.corr()
-    print("• Matriz de correlación entre variables numéricas:")
-    print(correlation)
 
-    # Visualización de correlaciones
+def fig_correlacion(correlation, path):
     plt.figure(figsize=(10, 8))
     sns.heatmap(correlation, annot=True, cmap='coolwarm', center=0)
     plt.title('Correlación entre Variables Numéricas')
     plt.tight_layout()
-    plt.savefig('../imagenes/correlacion.png')
-
-    # 12. EVOLUCIÓN DE GÉNEROS A LO LARGO DEL TIEMPO
-    # ---------------------------------------------
-    print("\n\n12. EVOLUCIÓN DE GÉNEROS A LO LARGO DEL TIEMPO")
-    print("-" * 50)
-
-    # Obtener los 5 géneros más comunes
-    top5_genres = all_genres.value_counts().head(5).index.tolist()
-
-    # Crear un DataFrame para el análisis de evolución de géneros
-    genre_evolution = {}
-    for genre in top5_genres:
-        # Filtramos el DataFrame para cada género
-        genre_data = df_clean[df_clean['listed_in'].str.contains(genre)]
-        # Contamos títulos por año
-        yearly_counts = genre_data.groupby('release_year').size()
-        genre_evolution[genre] = yearly_counts
+    plt.savefig(path)
 
-    genre_evolution_df = pd.DataFrame(genre_evolution)
-    genre_evolution_df = genre_evolution_df.fillna(0)
 
-    print("• Evolución de los 5 géneros principales (muestra de los últimos 10 años):")
-    print(genre_evolution_df.tail(10))
-
-    # Visualización de evolución de géneros
+def fig_evolucion_generos(genre_evolution_df, top5_genres, path):
     plt.figure(figsize=(15, 8))
     genre_evolution_df[top5_genres].plot(marker='o')
     plt.title('Evolución de los 5 Géneros Principales por Año')
@@ -359,7 +398,217 @@ def print_hi(name):
     plt.grid(True, alpha=0.3)
     plt.legend(title='Género')
     plt.tight_layout()
-    plt.savefig('../imagenes/evolucion_generos.png')
+    plt.savefig(path)
+
+
+# Figuras: archivo -> (función que la dibuja, agregados que necesita)
+FIGURES = {
+    'valores_faltantes.png': (fig_valores_faltantes, ['missing_mask']),
+    'distribucion_tipos.png': (fig_distribucion_tipos, ['types']),
+    'lanzamientos_por_año.png': (fig_lanzamientos_por_anio, ['releases_by_year']),
+    'adiciones_por_año.png': (fig_adiciones_por_anio, ['yearly_additions']),
+    'evolucion_contenido.png': (fig_evolucion_contenido, ['content_by_year']),
+    'heatmap_estrenos.png': (fig_heatmap_estrenos, ['heatmap_data']),
+    'top_paises.png': (fig_top_paises, ['country_counts']),
+    'clasificaciones.png': (fig_clasificaciones, ['ratings', 'rating_counts']),
+    'generos.png': (fig_generos, ['genre_counts']),
+    'duracion_peliculas.png': (fig_duracion_peliculas, ['movie_durations']),
+    'temporadas_series.png': (fig_temporadas_series, ['season_counts']),
+    'top_directores.png': (fig_top_directores, ['top_directors']),
+    'correlacion.png': (fig_correlacion, ['correlation']),
+    'evolucion_generos.png': (fig_evolucion_generos, ['genre_evolution_df', 'top5_genres']),
+}
+
+
+# Dibuja una figura en un proceso aparte y cierra todas sus ventanas para liberar memoria
+def render_figure(filename, inputs, images_dir=IMAGES_DIR):
+    function, _ = FIGURES[filename]
+    try:
+        function(*inputs, os.path.join(images_dir, filename))
+    finally:
+        plt.close('all')
+    return filename
+
+
+# Huella de una figura: el código fuente de la función que la dibuja y sus datos.
+# Si ninguno cambia y la imagen existe, no hace falta dibujarla de nuevo. Usamos el código fuente completo
+# (y no solo las instrucciones compiladas) para que también cuente cambiar un título, un color o una etiqueta.
+def figure_hash(filename, inputs):
+    function, _ = FIGURES[filename]
+    source = inspect.getsource(function).encode('utf-8')
+    return hashlib.sha256(source + pickle.dumps(inputs, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+
+
+# Lanza en paralelo las figuras que faltan o cuyos datos cambiaron.
+# Devuelve los trabajos en curso y la función para registrar las huellas cuando terminen.
+# Cada carpeta de imágenes tiene su propio registro de huellas (manifest), así los dos modos no se pisan.
+def render_figures(agg, executor, images_dir=IMAGES_DIR, manifest_name='figuras.json'):
+    manifest_path = os.path.join(CACHE_DIR, manifest_name)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+
+    futures, hashes = {}, {}
+    for filename, (_, keys) in FIGURES.items():
+        # En modo streaming no están los datos fila a fila (mapa de faltantes, duraciones, ...): esas figuras se omiten
+        if not all(k in agg for k in keys):
+            continue
+        inputs = [agg[k] for k in keys]
+        hashes[filename] = figure_hash(filename, inputs)
+        if manifest.get(filename) == hashes[filename] and os.path.exists(os.path.join(images_dir, filename)):
+            continue
+        os.makedirs(images_dir, exist_ok=True)
+        futures[filename] = executor.submit(render_figure, filename, inputs, images_dir)
+
+    def finish():
+        for filename, future in futures.items():
+            future.result()
+            manifest[filename] = hashes[filename]
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        return sorted(futures)
+
+    return finish
+
+
+def print_hi(name):
+    # Use a breakpoint in the code line below to debug your script.
+    print(f'Hi, {name}')  # Press Ctrl+F8 to toggle the breakpoint.
+
+    # Etapas 1 y 2: datos limpios y agregados, desde la caché en disco si el dataset no cambió
+    key = dataset_hash()
+    df, df_clean = cached('clean', key, load_clean)
+    agg = cached('aggregates', key, lambda: compute_aggregates(df, df_clean))
+
+    # Etapa 3: las figuras se dibujan en paralelo mientras se imprime el informe
+    with ProcessPoolExecutor() as executor:
+        finish = render_figures(agg, executor)
+
+        # 1. CARGA Y EXPLORACIÓN INICIAL DE DATOS
+        # ---------------------------------------
+        print("1. CARGA Y EXPLORACIÓN INICIAL DE DATOS")
+        print("-" * 50)
+
+        # Información básica del dataset
+        print("\n• Información básica del dataset:")
+        print(f"Dimensiones del dataset: {df.shape[0]} filas x {df.shape[1]} columnas")
+        print("\n• Primeras 5 filas del dataset:")
+        print(df.head())
+
+        # Información de las columnas
+        print("\n• Información de tipos de datos:")
+        print(df.info())
+
+        # Estadísticas descriptivas
+        print("\n• Estadísticas descriptivas:")
+        print(df.describe(include='all'))
+
+        # 2. ANÁLISIS DE VALORES FALTANTES
+        # --------------------------------
+        print("\n\n2. ANÁLISIS DE VALORES FALTANTES")
+        print("-" * 50)
+
+        missing_data = agg['missing_data']
+        print("• Análisis de valores faltantes por columna:")
+        print(missing_data[missing_data['Valores Faltantes'] > 0].sort_values(by='Valores Faltantes', ascending=False))
+
+        # 3. PREPROCESAMIENTO BÁSICO
+        # -------------------------
+        print("\n\n3. PREPROCESAMIENTO BÁSICO")
+        print("-" * 50)
+
+        print("• Nuevas columnas creadas:")
+        print(df_clean[['date_added', 'year_added', 'month_added', 'duration', 'duration_numeric', 'duration_unit']].head())
+
+        # 4. ANÁLISIS DE DISTRIBUCIÓN DE CONTENIDO
+        # ---------------------------------------
+        print("\n\n4. ANÁLISIS DE DISTRIBUCIÓN DE CONTENIDO")
+        print("-" * 50)
+
+        content_distribution = agg['content_distribution']
+        print("• Distribución por tipo de contenido:")
+        print(content_distribution)
+        print(f"Porcentaje de películas: {(content_distribution['Movie'] / len(df_clean) * 100):.2f}%")
+        print(f"Porcentaje de series: {(content_distribution['TV Show'] / len(df_clean) * 100):.2f}%")
+
+        # 5. ANÁLISIS TEMPORAL
+        # -------------------
+        print("\n\n5. ANÁLISIS TEMPORAL")
+        print("-" * 50)
+
+        print("• Top 10 años con más lanzamientos:")
+        print(agg['releases_by_year'].sort_values(ascending=False).head(10))
+
+        print("\n• Contenido añadido a Netflix por año:")
+        print(agg['yearly_additions'])
+
+        print("\n• Evolución de tipos de contenido por año (muestra):")
+        print(agg['content_by_year'].tail(10))  # últimos 10 años
+
+        # 6. ANÁLISIS POR PAÍS
+        # -------------------
+        print("\n\n6. ANÁLISIS POR PAÍS")
+        print("-" * 50)
+
+        print("• Top 15 países con más contenido:")
+        print(agg['country_counts'])
+
+        # 7. ANÁLISIS DE CLASIFICACIONES (RATINGS)
+        # --------------------------------------
+        print("\n\n7. ANÁLISIS DE CLASIFICACIONES (RATINGS)")
+        print("-" * 50)
+
+        print("• Distribución de clasificaciones:")
+        print(agg['rating_counts'])
+
+        # 8. ANÁLISIS DE GÉNEROS
+        # ---------------------
+        print("\n\n8. ANÁLISIS DE GÉNEROS")
+        print("-" * 50)
+
+        print("• Top 15 géneros en Netflix:")
+        print(agg['genre_counts'])
+
+        # 9. ANÁLISIS DE DURACIÓN
+        # ----------------------
+        print("\n\n9. ANÁLISIS DE DURACIÓN")
+        print("-" * 50)
+
+        print("• Estadísticas de duración de películas (minutos):")
+        print(agg['movie_durations']['duration_numeric'].describe())
+
+        print("\n• Distribución de temporadas en series:")
+        print(agg['season_counts'])
+
+        # 10. ANÁLISIS DE DIRECTORES
+        # -------------------------
+        print("\n\n10. ANÁLISIS DE DIRECTORES")
+        print("-" * 50)
+
+        print("• Top 15 directores con más contenido:")
+        print(agg['top_directors'])
+
+        # 11. ANÁLISIS DE CORRELACIONES
+        # ----------------------------
+        print("\n\n11. ANÁLISIS DE CORRELACIONES")
+        print("-" * 50)
+
+        print("• Matriz de correlación entre variables numéricas:")
+        print(agg['correlation'])
+
+        # 12. EVOLUCIÓN DE GÉNEROS A LO LARGO DEL TIEMPO
+        # ---------------------------------------------
+        print("\n\n12. EVOLUCIÓN DE GÉNEROS A LO LARGO DEL TIEMPO")
+        print("-" * 50)
+
+        print("• Evolución de los 5 géneros principales (muestra de los últimos 10 años):")
+        print(agg['genre_evolution_df'].tail(10))
+
+        # Esperamos a que terminen las figuras
+        rendered = finish()
+    print(f"\n• Figuras generadas: {len(rendered)} (sin cambios: {len(FIGURES) - len(rendered)})")
 
     # 13. HALLAZGOS PRINCIPALES
     # ------------------------
@@ -402,6 +651,63 @@ def print_hi(name):
     print("\n¡Análisis Exploratorio Completo!")
 
 
+# Informe reducido del modo streaming: solo lo que se puede calcular sumando conteos de cada bloque
+def print_streaming_report(chunksize):
+    agg = compute_aggregates_streaming(chunksize=chunksize)
+    with ProcessPoolExecutor() as executor:
+        finish = render_figures(agg, executor, STREAMING_IMAGES_DIR, 'figuras_streaming.json')
+
+        print(f"ANÁLISIS POR BLOQUES DE {chunksize} FILAS")
+        print("-" * 50)
+
+        print("• Valores faltantes por columna:")
+        missing_data = agg['missing_data']
+        print(missing_data[missing_data['Valores Faltantes'] > 0].sort_values(by='Valores Faltantes', ascending=False))
+
+        print("\n• Distribución por tipo de contenido:")
+        print(agg['content_distribution'])
+
+        print("\n• Top 10 años con más lanzamientos:")
+        print(agg['releases_by_year'].sort_values(ascending=False).head(10))
+
+        print("\n• Contenido añadido a Netflix por año:")
+        print(agg['yearly_additions'])
+
+        print("\n• Top 15 países con más contenido:")
+        print(agg['country_counts'])
+
+        print("\n• Distribución de clasificaciones:")
+        print(agg['rating_counts'])
+
+        print("\n• Top 15 géneros en Netflix:")
+        print(agg['genre_counts'])
+
+        print("\n• Estadísticas de duración de películas (minutos):")
+        print(agg['movie_duration_stats'])
+
+        print("\n• Distribución de temporadas en series:")
+        print(agg['season_counts'])
+
+        print("\n• Top 15 directores con más contenido:")
+        print(agg['top_directors'])
+
+        print("\n• Evolución de los 5 géneros principales (muestra de los últimos 10 años):")
+        print(agg['genre_evolution_df'].tail(10))
+
+        rendered = finish()
+    print(f"\n• Figuras generadas: {len(rendered)} (en {STREAMING_IMAGES_DIR})")
+
+
 # Press the green button in the gutter to run the script.
 if __name__ == '__main__':
-    print_hi('Netflix Titles')
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Análisis exploratorio del catálogo de Netflix")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="leer el CSV por bloques de N filas (para catálogos que no caben en memoria)")
+    args = parser.parse_args()
+
+    if args.chunksize:
+        print_streaming_report(args.chunksize)
+    else:
+        print_hi('Netflix Titles')
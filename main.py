@@ -8,45 +8,962 @@ La función get_movies_by_category (cagory) ayuda a encontrar películas según
 """
 
 # Importamos las herramientas necesarias para contruir nuestra API
-from fastapi import FastAPI, HTTPException # FastAPI nos ayuda a crear la API, HTTPException maneja errores.	I
-from fastapi.responses import HTMLResponse, JSONResponse # HTMLResponse nos permite responder con HTML, JSONResponse nos permite responder con JSON.
+from fastapi import FastAPI, HTTPException, Body, Query, Header, BackgroundTasks # FastAPI nos ayuda a crear la API, HTTPException maneja errores.	I
+from fastapi.responses import HTMLResponse, StreamingResponse, Response, PlainTextResponse # HTMLResponse nos permite responder con HTML, Response con bytes ya codificados.
+from starlette.datastructures import Headers # Lee las cabeceras de la petición en el middleware de métricas.
 import pandas as pd # Pandas nos ayuda a manejar datos en tablasm como si fuera una hoja de cálculo.
+import numpy as np # NumPy hace cálculos sobre arreglos completos de una sola vez (por ejemplo los puntajes de búsqueda).
 import nltk # NLTK es una librería para procesar texto y analizar palabras.
 from nltk.tokenize import word_tokenize # Se usa para dividir un texto en palabras individuales.
 from nltk.corpus import wordnet # Nos ayuda a encontrar sinonimos de palabras.
+import re # Expresiones regulares para separar los títulos en palabras.
+import unicodedata # Quita los acentos de los títulos para el autocompletado.
+from typing import Literal # Permite limitar los valores aceptados por un parámetro.
+from datetime import date # Fechas de los filtros (por ejemplo desde cuándo se agregó a Netflix).
+import json # Convierte cada película a texto JSON para enviarlas una por una.
+try:
+    import orjson # Opcional: convierte a JSON mucho más rápido (pip install orjson); si no está se usa json.
+except ImportError:
+    orjson = None
+import gzip # Comprime las respuestas para enviarlas más livianas.
+import hashlib # Calcula la huella (ETag) del contenido de cada respuesta.
+import hmac # Compara el token de administración sin revelar cuántos caracteres coinciden.
+import os # Para comprobar si existen los archivos precalculados.
+import argparse # Lee los comandos de la línea de comandos (por ejemplo para precalcular sinónimos).
+from functools import lru_cache # Memoriza resultados de funciones para no recalcularlos.
+from collections import Counter, OrderedDict # Counter cuenta palabras; OrderedDict recuerda el orden de uso (caché LRU).
+import threading # Recarga el catálogo en segundo plano.
+from contextlib import asynccontextmanager # Arranca y detiene el vigilante del catálogo junto con la API.
+from cleaning import clean_titles # Limpieza del dataset compartida con el análisis exploratorio (eda/eda.py).
+from store import MovieStore # Almacén compacto por columnas del catálogo, compartido entre procesos con mmap.
+import similar # Tabla de títulos parecidos (vecinos más cercanos) calculada al cargar el catálogo.
+import metrics # Contadores, histogramas de latencia y perfilador, expuestos en /metrics.
+from metrics import timer # Mide cuánto tarda cada fase de una operación.
+import time # Medimos cuánto tarda en arrancar la API.
 
 
-# Configuración de NLTK - Descargamos los recursos necesarios
-try:
-    # Descargamos directamente sin especificar ruta para evitar problemas
-    nltk.download('punkt')
-    nltk.download('wordnet')
-except Exception as e:
-    print(f"Error al configurar NLTK: {e}")
+# Archivos del catálogo: el CSV original y una copia binaria por columnas (snapshot) que se abre con mmap
+CSV_PATH = './dataset/netflix_titles.csv'
+SNAPSHOT_PATH = './dataset/netflix_titles.store'
+# Versión del formato del catálogo: si cambia la forma de procesar el CSV, los snapshots anteriores dejan de servir
+SNAPSHOT_VERSION = 9
 
-def load_movies():
+# Los recursos de NLTK (punkt y wordnet) ya no se descargan al importar la API: se buscan solo en el disco
+# cuando se necesitan y se descargan una vez con el comando de preparación (python main.py prepare).
+NLTK_RESOURCES = ['punkt', 'punkt_tab', 'wordnet']
+
+def download_nltk_resources():
+    for resource in NLTK_RESOURCES:
+        nltk.download(resource, quiet=True)
+
+# Huella del CSV (tamaño y fecha de modificación): si cambia, el snapshot quedó desactualizado
+def csv_signature(path=CSV_PATH):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+# Convierte un conteo de pandas (value_counts) en una lista [{"valor": ..., "cantidad": ...}] lista para enviar como JSON
+def counts_to_list(counts):
+    return [{'valor': k.item() if hasattr(k, 'item') else k, 'cantidad': int(v)} for k, v in counts.items()]
+
+# Estadísticas del catálogo (las mismas del análisis exploratorio), calculadas con operaciones de pandas sobre columnas completas
+def compute_stats(df_clean):
+    # Columnas con varios valores separados por comas ("United States, India")
+    def split_values(column):
+        return df_clean[column].str.split(', ').explode().str.strip()
+
+    movies = df_clean.loc[df_clean['type'] == 'Movie', 'duration_numeric']
+    seasons = df_clean.loc[df_clean['type'] == 'TV Show', 'duration_numeric']
+    directors = df_clean.loc[df_clean['director'] != 'Sin director', 'director'].str.split(', ').explode().str.strip()
+    minutes = movies.describe()
+    return {
+        'genres': counts_to_list(split_values('listed_in').value_counts()),
+        'countries': counts_to_list(split_values('country').value_counts()),
+        'ratings': counts_to_list(df_clean['rating'].value_counts()),
+        'types': counts_to_list(df_clean['type'].value_counts()),
+        'years': {
+            'lanzamientos': counts_to_list(df_clean['release_year'].value_counts().sort_index()),
+            'agregados': counts_to_list(df_clean['year_added'].dropna().astype(int).value_counts().sort_index()),
+        },
+        'directors': counts_to_list(directors.value_counts()),
+        'durations': {
+            'peliculas_minutos': {k: (None if pd.isna(v) else round(float(v), 2)) for k, v in minutes.items()},
+            'series_temporadas': counts_to_list(seasons.dropna().astype(int).value_counts().sort_index()),
+        },
+    }
+
+# Leemos el CSV original, solo con las columnas que usamos, y calculamos las estadísticas del catálogo con la misma lectura
+def read_catalog_csv(path=CSV_PATH):
     # Leemos el archivo que contiene información de películas y seleccionamos las columnas más importantes
-    df = pd.read_csv('./dataset/netflix_titles.csv')[['show_id','title','release_year','listed_in','description','rating']]
+    columns = ['show_id','title','release_year','listed_in','description','rating']
+    stats_columns = ['type', 'director', 'cast', 'country', 'date_added', 'duration']
+    raw = pd.read_csv(path, usecols=columns + stats_columns)
+    df = raw[columns].copy()
+
+    # Renombramos las columnas para que sean más faciles de entender (description -> overview, en el mismo orden).
+    df.columns = ['id','title','year','category','overview','rating']
 
-    # Renombramos las columnas para que sean más faciles de entender.
-    df.columns = ['id','title','year','category','rating','overview']
+    # Columnas ocultas para los filtros de /movies/query/ (no aparecen en las respuestas, ver HIDDEN_COLUMNS)
+    df['type'] = raw['type']
+    df['country'] = raw['country']
+    df['cast'] = raw['cast']
+    # La fecha en que se agregó a Netflix como número AAAAMMDD (0 si no tiene), así se compara como un entero
+    added = pd.to_datetime(raw['date_added'].str.strip(), format='%B %d, %Y', errors='coerce')
+    df['date_added'] = (added.dt.year * 10000 + added.dt.month * 100 + added.dt.day).fillna(0).astype(int)
     # Llenamos los espacios vacios con texto vacío y convertimos los datos en una lista de diccionarios
-    return df.fillna('').to_dict(orient = 'records')
+    return df.fillna('').to_dict(orient = 'records'), compute_stats(clean_titles(raw))
+
+# Columnas del catálogo que solo se usan para filtrar: se guardan en el almacén pero no se envían en las respuestas
+HIDDEN_COLUMNS = ('type', 'country', 'date_added', 'cast')
+
+# Solo las películas, como lista de diccionarios
+def read_movies_csv(path=CSV_PATH):
+    return read_catalog_csv(path)[0]
+
+# Guardamos el catálogo ya procesado como almacén por columnas, junto con la huella del CSV del que salió,
+# sus estadísticas, todos sus índices y la tabla de títulos parecidos (ver save_indexes), para no tener que volver
+# a leer el CSV ni construir los índices al iniciar cada proceso: todos comparten la misma copia del archivo.
+# Con el catálogo anterior (previous) la tabla de títulos parecidos solo se recalcula para lo que cambió.
+def save_snapshot(movies, stats, path=SNAPSHOT_PATH, previous=None):
+    meta = {'signature': csv_signature(), 'version': SNAPSHOT_VERSION, 'stats': stats}
+    store = MovieStore.from_records(movies, meta=meta, hidden=HIDDEN_COLUMNS)
+    c = build_catalog(store, previous)
+    build_similar(c, previous)
+    save_indexes(c, store)
+    store.save(path)
+
+# Abre el snapshot si existe y corresponde al CSV actual; si no, devuelve None
+def load_snapshot(path=SNAPSHOT_PATH):
+    if not os.path.exists(path):
+        return None
+    store = MovieStore.open(path)
+    if store.meta.get('signature') != csv_signature() or store.meta.get('version') != SNAPSHOT_VERSION:
+        print("El snapshot del catálogo está desactualizado, se usará el CSV (ejecuta: python main.py prepare)")
+        return None
+    return store
+
+def load_movies():
+    # Primero intentamos con el snapshot, que se comparte entre todos los procesos que lo abren;
+    # solo si falta o está desactualizado leemos el CSV y armamos el almacén en la memoria de este proceso
+    with timer('catalog_load_phase_seconds', phase='snapshot'):
+        movies = load_snapshot()
+    if movies is not None:
+        startup_stats['catalog_source'] = 'snapshot'
+        return movies
+    startup_stats['catalog_source'] = 'csv'
+    with timer('catalog_load_phase_seconds', phase='csv'):
+        records, stats = read_catalog_csv()
+    with timer('catalog_load_phase_seconds', phase='store'):
+        return MovieStore.from_records(records, meta={'stats': stats}, hidden=HIDDEN_COLUMNS)
+
+# Índice invertido guardado por columnas (como CSC): como el índice alfabético al final de un libro,
+# nos dice en qué películas aparece cada clave sin tener que revisar todo el catálogo.
+# Para la clave t (su número en vocabulary), indices[indptr[t]:indptr[t + 1]] son las posiciones de sus películas
+# en orden del catálogo. Son arreglos de NumPy, así se guardan en el snapshot y los procesos los comparten.
+# keys_per_row trae (posición, claves) de cada película a agregar. Con el índice anterior (previous) solo se
+# procesan las películas nuevas o modificadas: las demás conservan sus claves del índice anterior, pasadas a su
+# nueva posición con old_to_new (-1 para las películas que se eliminaron o cambiaron).
+def build_postings(keys_per_row, previous=None, old_to_new=None):
+    vocabulary, terms, docs, _ = previous_postings(previous, old_to_new)
+    new_terms, new_docs = [], []
+    for i, keys in keys_per_row:
+        for key in keys:
+            new_terms.append(vocabulary.setdefault(key, len(vocabulary)))
+            new_docs.append(i)
+    terms = np.concatenate([terms, np.array(new_terms, dtype=np.int64)])
+    docs = np.concatenate([docs, np.array(new_docs, dtype=np.int64)])
+    return pack_postings(vocabulary, terms, docs)[0]
+
+# Pares (clave, película) del índice anterior, con cada película en su nueva posición.
+# keep dice cuáles pares se conservaron (sirve para tomar los demás datos de cada par, como la frecuencia en BM25).
+def previous_postings(previous, old_to_new):
+    if previous is None:
+        return {}, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool)
+    indptr = previous['indptr']
+    terms = np.repeat(np.arange(len(indptr) - 1, dtype=np.int64), np.diff(indptr))
+    docs = old_to_new[previous['indices']]
+    keep = docs >= 0
+    return dict(previous['vocabulary']), terms[keep], docs[keep], keep
+
+# Arma el índice a partir de los pares (clave, película): quita las claves que quedaron sin películas
+# y ordena por clave y, dentro de cada clave, por posición. Devuelve también el orden aplicado a los pares.
+def pack_postings(vocabulary, terms, docs):
+    counts = np.bincount(terms, minlength=len(vocabulary))
+    used = counts > 0
+    if not used.all():
+        renumber = np.cumsum(used) - 1
+        terms = renumber[terms]
+        vocabulary = {key: i for i, key in enumerate(key for key, u in zip(vocabulary, used.tolist()) if u)}
+        counts = counts[used]
+    order = np.lexsort((docs, terms))
+    indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return {'vocabulary': vocabulary, 'indptr': indptr, 'indices': docs[order].astype(np.int32)}, order
+
+# Valores por película del índice anterior (por ejemplo cuántos trigramas tiene cada título) en la nueva posición
+# de cada película sin cambios; las nuevas o modificadas quedan en 0 hasta que se calculen
+def carry_rows(values, old_to_new, size, dtype):
+    result = np.zeros(size, dtype=dtype)
+    if values is not None:
+        kept = old_to_new >= 0
+        result[old_to_new[kept]] = values[kept]
+    return result
+
+# Posiciones de las películas que tienen la clave en un índice invertido (vacío si la clave no está)
+def postings(index, key):
+    t = index['vocabulary'].get(key)
+    if t is None:
+        return index['indices'][:0]
+    return index['indices'][index['indptr'][t]:index['indptr'][t + 1]]
+
+# Índice de títulos para el chatbot.
+# rows trae, para cada posición a procesar, las palabras del título (ver process_row); titles son todos los títulos
+def build_title_index(titles, rows, previous=None, old_to_new=None):
+    # Índice palabra -> posiciones de las películas cuyo título contiene esa palabra completa
+    index = build_postings(((i, row['tokens']) for i, row in rows.items()), previous, old_to_new)
+
+    # Para la búsqueda por subcadena unimos todos los títulos en un solo texto (en bytes UTF-8)
+    # y guardamos dónde empieza cada uno, así un solo recorrido en C encuentra todas las coincidencias.
+    # Es rápido de armar, así que se rehace completo aunque solo cambien algunas películas.
+    encoded = [title.lower().encode('utf-8') for title in titles]
+    starts = np.zeros(len(encoded), dtype=np.int64)
+    if encoded:
+        np.cumsum([len(e) + 1 for e in encoded[:-1]], out=starts[1:])
+    index['text'] = np.frombuffer(b'\n'.join(encoded), dtype=np.uint8)
+    index['starts'] = starts
+    return index
+
+# Separamos los géneros de cada película ("International TV Shows, TV Dramas") en un conjunto normalizado
+def parse_genres(category):
+    return {g.strip().lower() for g in category.split(',') if g.strip()}
+
+# Índice de géneros: género -> posiciones de las películas que lo tienen (en orden del catálogo)
+def build_genre_index(rows, previous=None, old_to_new=None):
+    return build_postings(((i, row['genres']) for i, row in rows.items()), previous, old_to_new)
+
+# Normaliza un texto para el autocompletado: minúsculas, sin acentos y con las palabras separadas por un solo espacio
+def normalize_title(text):
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ' '.join(re.findall(r'\w+', ''.join(ch for ch in text if not unicodedata.combining(ch))))
+
+# Cuántos bytes del título guarda el autocompletado a partir de cada palabra
+AUTOCOMPLETE_WIDTH = 32
+
+# Índice de autocompletado: para cada palabra de cada título, el resto del título desde esa palabra
+# ("stranger things" -> "stranger things" y "things"), en un arreglo ordenado de textos de ancho fijo.
+# Todos los textos que empiezan con un prefijo quedan seguidos, así dos búsquedas binarias (searchsorted) dan el rango.
+# Cada entrada trae además su orden de preferencia ya calculado: primero los estrenos más recientes
+# y, a igual año, el orden del catálogo ((3000 - año) en los bits altos y la posición en los bajos).
+def build_autocomplete_index(movies):
+    keys, ranks = [], []
+    for i, (title, year) in enumerate(zip(movies.column('title'), movies.column('year'))):
+        title = normalize_title(title)
+        for match in re.finditer(r'\w+', title):
+            keys.append(title[match.start():].encode('utf-8')[:AUTOCOMPLETE_WIDTH])
+            ranks.append(((3000 - year) << 32) | i)
+    keys = np.array(keys, dtype=f'S{AUTOCOMPLETE_WIDTH}')
+    order = np.argsort(keys, kind='stable')
+    return {'keys': keys[order], 'ranks': np.array(ranks, dtype=np.int64)[order]}
+
+# Devuelve las posiciones de hasta n títulos con alguna palabra que empiece con el prefijo, los más recientes primero
+def search_prefix(autocomplete_index, prefix, n):
+    prefix = normalize_title(prefix).encode('utf-8')[:AUTOCOMPLETE_WIDTH]
+    if not prefix:
+        return []
+    keys = autocomplete_index['keys']
+    start = np.searchsorted(keys, prefix, side='left')
+    end = np.searchsorted(keys, prefix + b'\xff', side='left')
+    ranks = autocomplete_index['ranks'][start:end]
+    # Un título puede coincidir por varias palabras: np.unique ordena y quita repetidos a la vez.
+    # Con muchos resultados primero nos quedamos con los mejores candidatos (selección parcial)
+    if len(ranks) > 8 * n:
+        best = np.unique(ranks[np.argpartition(ranks, 8 * n)[:8 * n]])
+        if len(best) >= n:
+            ranks = best
+    ranks = np.unique(ranks)[:n]
+    return (ranks & 0xFFFFFFFF).tolist()
+
+# Empaqueta un arreglo de verdadero/falso (uno por película, en la última dimensión) en bitmaps de enteros de 64 bits:
+# un bit por película, así un AND entre dos bitmaps procesa 64 películas por operación
+def pack_bits(flags):
+    packed = np.packbits(flags, axis=-1)
+    padding = -packed.shape[-1] % 8
+    if padding:
+        packed = np.concatenate([packed, np.zeros(packed.shape[:-1] + (padding,), dtype=np.uint8)], axis=-1)
+    return packed.view(np.uint64)
+
+# Cuenta los bits en 1 de cada fila de bitmaps (cuántas películas tiene cada valor).
+# np.bitwise_count existe desde NumPy 2.0; con versiones anteriores contamos por bytes con una tabla.
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def count_bits(bitmaps):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(bitmaps).sum(axis=-1, dtype=np.int64)
+    return POPCOUNT[bitmaps.view(np.uint8)].sum(axis=-1, dtype=np.int64)
+
+# Índice de bitmaps para los filtros de /movies/query/: para cada valor de cada filtro (tipo, clasificación, país, género)
+# un bitmap con un bit por película (ver pack_bits).
+# Los bitmaps de un mismo filtro van juntos en una matriz (una fila por valor), así se filtra con unos pocos AND
+# y se cuentan los resultados de todos los valores de un filtro en una sola operación.
+def build_facet_index(movies):
+    n = len(movies)
+    values = {
+        'type': [[v] for v in movies.column('type')],
+        'rating': [[v] for v in movies.column('rating')],
+        'country': [v.split(',') for v in movies.column('country')],
+        'genre': [v.split(',') for v in movies.column('category')],
+    }
+    facets = {}
+    for field, per_movie in values.items():
+        # Valor en minúsculas -> posiciones de sus películas, y el nombre tal como aparece en el catálogo
+        positions, labels = {}, {}
+        for i, items in enumerate(per_movie):
+            for item in items:
+                label = item.strip()
+                if label:
+                    positions.setdefault(label.lower(), []).append(i)
+                    labels.setdefault(label.lower(), label)
+        bits = np.zeros((len(positions), n), dtype=bool)
+        for row, found in enumerate(positions.values()):
+            bits[row, found] = True
+        facets[field] = {'rows': {key: row for row, key in enumerate(positions)},
+                         'labels': [labels[key] for key in positions],
+                         'bits': pack_bits(bits)}
+    # Los rangos (año de estreno y fecha en que se agregó) se comparan directamente sobre los arreglos de enteros
+    return facet_index(movies, facets)
+
+# Arma el índice de filtros con los bitmaps de cada filtro. Los rangos (año de estreno y fecha en que se agregó)
+# se comparan directamente sobre las columnas de enteros del almacén, sin copiarlas.
+def facet_index(movies, facets):
+    return {'size': len(movies), 'facets': facets,
+            'years': np.asarray(movies.arrays['year'], dtype=np.int64),
+            'dates': np.asarray(movies.arrays['date_added'], dtype=np.int64)}
+
+# Devuelve las posiciones de las películas que cumplen todos los filtros y los conteos por valor de cada filtro.
+# filters es filtro -> conjunto de valores en minúsculas (basta con que la película tenga uno de ellos);
+# ranges es (arreglo, mínimo, máximo) con None para los extremos abiertos.
+def query_facets(facet_index, filters, ranges):
+    n = facet_index['size']
+    mask = pack_bits(np.ones(n, dtype=bool))
+    for field, wanted in filters.items():
+        facet = facet_index['facets'][field]
+        rows = [facet['rows'][w] for w in wanted if w in facet['rows']]
+        # Unión (OR) de los valores pedidos de este filtro, e intersección (AND) con los demás filtros
+        mask &= np.bitwise_or.reduce(facet['bits'][rows], axis=0) if rows else 0
+    for values, low, high in ranges:
+        if low is not None:
+            mask &= pack_bits(values >= low)
+        if high is not None:
+            mask &= pack_bits(values <= high)
+
+    counts = {}
+    for field, facet in facet_index['facets'].items():
+        totals = count_bits(facet['bits'] & mask)
+        order = np.argsort(-totals, kind='stable')
+        counts[field] = [{'valor': facet['labels'][i], 'cantidad': int(totals[i])} for i in order if totals[i]]
+    return np.flatnonzero(np.unpackbits(mask.view(np.uint8), count=n)), counts
+
+# Las palabras del título pesan más que las de la descripción al ordenar por relevancia
+TITLE_BOOST = 2.0
+
+# Índice de búsqueda por relevancia (BM25) sobre el título y la descripción.
+# Es una matriz dispersa palabra x película guardada por columnas (como CSC): para la palabra t,
+# indices[indptr[t]:indptr[t + 1]] son las películas que la contienen y data[...] su peso BM25 ya calculado.
+# Así puntuar una consulta es sumar unos pocos arreglos, sin recorrer el catálogo.
+# También guarda la frecuencia de cada palabra (freqs) y el largo de cada texto (lengths): los pesos dependen de todo
+# el catálogo, así al recargar se recalculan con ellos sin volver a procesar las películas que no cambiaron.
+def build_search_index(rows, size, previous=None, old_to_new=None, k1=1.2, b=0.75):
+    vocabulary, terms, docs, keep = previous_postings(previous, old_to_new)
+    freqs = previous['freqs'][keep] if previous is not None else np.zeros(0, dtype=np.float32)
+    lengths = carry_rows(previous['lengths'] if previous is not None else None, old_to_new, size, np.float32)
+    new_terms, new_docs, new_freqs = [], [], []
+    for i, row in rows.items():
+        for term, tf in row['terms'].items():
+            new_terms.append(vocabulary.setdefault(term, len(vocabulary)))
+            new_docs.append(i)
+            new_freqs.append(tf)
+        lengths[i] = sum(row['terms'].values())
+    terms = np.concatenate([terms, np.array(new_terms, dtype=np.int64)])
+    docs = np.concatenate([docs, np.array(new_docs, dtype=np.int64)])
+    freqs = np.concatenate([freqs, np.array(new_freqs, dtype=np.float32)])
+
+    # Ordenamos por palabra para que las películas de cada palabra queden juntas
+    index, order = pack_postings(vocabulary, terms, docs)
+    freqs, docs = freqs[order], docs[order]
+    df = np.diff(index['indptr'])
+    terms = np.repeat(np.arange(len(df)), df)
+
+    # Fórmula BM25: las palabras raras (idf alto) valen más, y un texto largo no gana solo por repetir palabras
+    idf = np.log1p((size - df + 0.5) / (df + 0.5))
+    average_length = max(float(lengths.mean()), 1.0) if size else 1.0
+    tf_norm = freqs * (k1 + 1) / (freqs + k1 * (1 - b + b * lengths[docs] / average_length))
+    index.update({'data': (idf[terms] * tf_norm).astype(np.float32), 'freqs': freqs, 'lengths': lengths, 'size': size})
+    return index
+
+# Devuelve las posiciones de las k películas más relevantes para las palabras de la consulta.
+# weighted_terms es un diccionario palabra -> importancia dentro de la consulta.
+def search_ranked(search_index, weighted_terms, k):
+    vocabulary, indptr = search_index['vocabulary'], search_index['indptr']
+    indices, weights = [], []
+    for term, weight in weighted_terms.items():
+        t = vocabulary.get(term)
+        if t is None:
+            continue
+        indices.append(search_index['indices'][indptr[t]:indptr[t + 1]])
+        weights.append(search_index['data'][indptr[t]:indptr[t + 1]] * weight)
+    if not indices:
+        return []
+    # Sumamos los pesos de todas las palabras por película en una sola operación
+    scores = np.bincount(np.concatenate(indices), weights=np.concatenate(weights), minlength=search_index['size'])
+    candidates = np.flatnonzero(scores)
+    # Selección parcial: solo ordenamos las k mejores, no todo el catálogo
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+    # Ordenamos de mayor a menor puntaje (y por posición en el catálogo en caso de empate)
+    return sorted(candidates.tolist(), key=lambda i: (-scores[i], i))
+
+# Trigramas de un título: grupos de 3 letras seguidas de cada palabra, con espacios al inicio y al final
+# ("lost" -> "  l", " lo", "los", "ost", "st "). Dos títulos parecidos comparten la mayoría de sus trigramas
+# aunque tengan una letra de más, de menos o cambiada.
+def title_trigrams(title):
+    trigrams = set()
+    for word in re.findall(r'\w+', title.lower()):
+        padded = f'  {word} '
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+# Índice de trigramas para la búsqueda aproximada de títulos, guardado igual que el de relevancia (como CSC):
+# para el trigrama t, indices[indptr[t]:indptr[t + 1]] son las películas que lo tienen.
+# counts guarda cuántos trigramas distintos tiene cada título.
+def build_trigram_index(rows, size, previous=None, old_to_new=None):
+    index = build_postings(((i, row['trigrams']) for i, row in rows.items()), previous, old_to_new)
+    index['counts'] = carry_rows(previous['counts'] if previous is not None else None, old_to_new, size, np.int32)
+    for i, row in rows.items():
+        index['counts'][i] = len(row['trigrams'])
+    index['size'] = size
+    return index
+
+# Devuelve [(posición, similitud)] de los k títulos más parecidos a la consulta, de mayor a menor.
+# La similitud es la proporción de trigramas compartidos (compartidos / trigramas de ambos sin repetir), entre 0 y 1.
+def search_fuzzy(trigram_index, query, k, threshold):
+    query_trigrams = title_trigrams(query)
+    vocabulary, indptr = trigram_index['vocabulary'], trigram_index['indptr']
+    postings = [trigram_index['indices'][indptr[t]:indptr[t + 1]]
+                for t in (vocabulary.get(q) for q in query_trigrams) if t is not None]
+    if not postings:
+        return []
+    # Cuántos trigramas comparte cada título con la consulta, en una sola operación
+    shared = np.bincount(np.concatenate(postings), minlength=trigram_index['size'])
+    # Filtro de candidatos: con menos trigramas compartidos que este mínimo es imposible llegar al umbral,
+    # así solo calculamos la similitud de unos pocos títulos
+    minimum = max(1, int(np.ceil(threshold * len(query_trigrams))))
+    candidates = np.flatnonzero(shared >= minimum)
+    common = shared[candidates]
+    scores = common / (len(query_trigrams) + trigram_index['counts'][candidates] - common)
+    keep = scores >= threshold
+    candidates, scores = candidates[keep], scores[keep]
+    # Selección parcial: solo ordenamos las k mejores
+    if len(candidates) > k:
+        best = np.argpartition(-scores, k - 1)[:k]
+        candidates, scores = candidates[best], scores[best]
+    return sorted(zip(candidates.tolist(), scores.tolist()), key=lambda x: (-x[1], x[0]))
+
+# Huella de los archivos del catálogo: si cambia el CSV o el snapshot hay que recargar
+def catalog_files_signature():
+    snapshot = os.stat(SNAPSHOT_PATH).st_mtime_ns if os.path.exists(SNAPSHOT_PATH) else None
+    return [csv_signature(), snapshot]
+
+# Índice de IDs: los IDs ordenados (como textos de ancho fijo) y la posición de cada uno en el catálogo.
+# Una búsqueda binaria encuentra cualquier película en pocos pasos, sin recorrer la lista,
+# y al ser arreglos se guarda en el snapshot igual que los demás índices.
+def build_id_index(ids):
+    keys = np.array([id.encode('utf-8') for id in ids], dtype=f'S{max((len(id.encode("utf-8")) for id in ids), default=1)}')
+    order = np.argsort(keys, kind='stable')
+    return {'keys': keys[order], 'positions': order.astype(np.int64)}
+
+# Posiciones en el catálogo de varios IDs a la vez (-1 para los que no existen)
+def positions_of(id_index, ids):
+    keys = id_index['keys']
+    if not len(ids) or not len(keys):
+        return np.full(len(ids), -1, dtype=np.int64)
+    wanted = np.array([id.encode('utf-8') for id in ids])
+    found = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+    return np.where(keys[found] == wanted, id_index['positions'][found], -1)
+
+# Posición en el catálogo de un ID, o None si no existe
+def position_of(id_index, id):
+    position = int(positions_of(id_index, [id])[0])
+    return position if position >= 0 else None
+
+# Huella de cada fila con todos sus valores, para saber qué películas cambiaron.
+# Usamos blake2b (y no hash(), que cambia en cada proceso) porque las huellas se guardan en el snapshot.
+def row_fingerprints(movies):
+    columns = [movies.column(c['name']) for c in movies.columns]
+    return np.array([int.from_bytes(hashlib.blake2b(repr(values).encode('utf-8'), digest_size=8).digest(),
+                                    'little', signed=True) for values in zip(*columns)], dtype=np.int64)
+
+# Procesa una película (palabras, géneros) para armar los índices.
+# Estos datos solo sirven para armar los índices y se descartan al terminar.
+def process_row(title, category, overview):
+    title = title.lower()
+    title_words = re.findall(r'\w+', title)
+    # Frecuencia de cada palabra para la búsqueda por relevancia (las del título cuentan más)
+    terms = Counter(re.findall(r'\w+', overview.lower()))
+    for word in title_words:
+        terms[word] += TITLE_BOOST
+    return {'tokens': set(title_words), 'genres': parse_genres(category), 'terms': terms,
+            'trigrams': title_trigrams(title)}
+
+# Construye todos los índices derivados de las películas, midiendo cuánto tarda cada fase.
+# Con el catálogo anterior (previous) solo se procesan las películas nuevas o modificadas: los índices de títulos,
+# géneros, relevancia y trigramas conservan las entradas de las demás (ver build_postings).
+# Los de autocompletado, filtros e IDs se rehacen completos porque se arman directo de las columnas.
+def build_indexes(movies, previous=None):
+    with timer('catalog_load_phase_seconds', phase='rows'):
+        fingerprints = row_fingerprints(movies)
+        id_index = build_id_index(movies.column('id'))
+        positions, old_to_new = range(len(movies)), None
+        if previous is not None:
+            _, same, old_to_new = match_previous(movies, fingerprints, previous)
+            positions = np.flatnonzero(~same).tolist()
+        titles = movies.column('title')
+        categories, overviews = movies.column('category'), movies.column('overview')
+        rows = {i: process_row(titles[i], categories[i], overviews[i]) for i in positions}
+    # Sin catálogo anterior se construye todo desde cero
+    old = previous if previous is not None else {}
+
+    with timer('catalog_load_phase_seconds', phase='title_index'):
+        title_index = build_title_index(titles, rows, old.get('title_index'), old_to_new)
+    with timer('catalog_load_phase_seconds', phase='genre_index'):
+        genre_index = build_genre_index(rows, old.get('genre_index'), old_to_new)
+    with timer('catalog_load_phase_seconds', phase='search_index'):
+        search_index = build_search_index(rows, len(movies), old.get('search_index'), old_to_new)
+    with timer('catalog_load_phase_seconds', phase='trigram_index'):
+        trigram_index = build_trigram_index(rows, len(movies), old.get('trigram_index'), old_to_new)
+    with timer('catalog_load_phase_seconds', phase='facet_index'):
+        facet_index = build_facet_index(movies)
+    with timer('catalog_load_phase_seconds', phase='autocomplete_index'):
+        autocomplete_index = build_autocomplete_index(movies)
+
+    return {
+        # IDs ordenados para encontrar cualquier película por su ID (ver position_of).
+        # También sirve para continuar una paginación desde un cursor.
+        'id_index': id_index,
+        # Índice de títulos para el chatbot
+        'title_index': title_index,
+        # Índice de géneros: para cada género, las posiciones de sus películas, listas para responder sin recorrer el catálogo
+        'genre_index': genre_index,
+        # Índice de búsqueda por relevancia sobre el título y la descripción
+        'search_index': search_index,
+        # Índice de trigramas de los títulos para la búsqueda aproximada (tolera errores de escritura)
+        'trigram_index': trigram_index,
+        # Bitmaps por valor de tipo, clasificación, país y género para los filtros combinados
+        'facet_index': facet_index,
+        # Títulos ordenados para autocompletar por prefijo
+        'autocomplete_index': autocomplete_index,
+        # Huella de cada película (en orden del catálogo), para saber en la próxima recarga cuáles cambiaron
+        'fingerprints': fingerprints,
+    }
+
+# Índices que se guardan en el snapshot: sus arreglos van al archivo (se abren con mmap y los procesos los comparten)
+# y lo demás (vocabularios y tamaños) al encabezado JSON. Al abrir el snapshot cada proceso solo rearma los vocabularios.
+STORED_INDEXES = ('id_index', 'title_index', 'genre_index', 'search_index', 'trigram_index', 'autocomplete_index')
+
+def save_indexes(c, store):
+    meta = {}
+    for name in STORED_INDEXES:
+        meta[name] = {}
+        for key, value in c[name].items():
+            if isinstance(value, np.ndarray):
+                store.arrays[f'{name}.{key}'] = value
+            else:
+                # Los vocabularios se guardan como lista: la posición de cada clave es su número
+                meta[name][key] = list(value) if isinstance(value, dict) else value
+    # De los filtros se guardan los bitmaps y los nombres de los valores (una fila de bitmaps por valor)
+    meta['facet_index'] = {field: facet['labels'] for field, facet in c['facet_index']['facets'].items()}
+    for field, facet in c['facet_index']['facets'].items():
+        store.arrays[f'facet_index.{field}'] = facet['bits']
+    store.arrays['fingerprints'] = c['fingerprints']
+    store.arrays['similar.positions'] = c['similar']['positions']
+    store.arrays['similar.scores'] = c['similar']['scores']
+    store.meta['indexes'] = meta
+
+# Lee los índices guardados en el snapshot con save_indexes: los arreglos se usan directamente desde el mmap
+def load_indexes(movies):
+    meta = movies.meta['indexes']
+    indexes = {}
+    for name in STORED_INDEXES:
+        index = {key: {k: i for i, k in enumerate(value)} if key == 'vocabulary' else value
+                 for key, value in meta[name].items()}
+        prefix = name + '.'
+        index.update({key[len(prefix):]: array for key, array in movies.arrays.items() if key.startswith(prefix)})
+        indexes[name] = index
+    facets = {field: {'rows': {label.lower(): row for row, label in enumerate(labels)}, 'labels': labels,
+                      'bits': movies.arrays[f'facet_index.{field}']}
+              for field, labels in meta['facet_index'].items()}
+    indexes['facet_index'] = facet_index(movies, facets)
+    indexes['fingerprints'] = movies.arrays['fingerprints']
+    return indexes
+
+# Compara las películas con las del catálogo anterior: para cada película, su posición en el anterior (-1 si es nueva)
+# y si no cambió (la misma huella); y para cada película del anterior, su nueva posición si sigue igual (-1 si no)
+def match_previous(movies, fingerprints, previous):
+    old_positions = positions_of(previous['id_index'], movies.column('id'))
+    same = old_positions >= 0
+    same[same] = previous['fingerprints'][old_positions[same]] == fingerprints[same]
+    old_to_new = np.full(len(previous['movies']), -1, dtype=np.int64)
+    old_to_new[old_positions[same]] = np.flatnonzero(same)
+    return old_positions, same, old_to_new
+
+# Construye el catálogo completo: las películas y todos los índices derivados, en un solo diccionario.
+# Si las películas vienen del snapshot, los índices ya están guardados en el mismo archivo y no se recalculan.
+# Si recibimos el catálogo anterior (previous), las películas que no cambiaron conservan sus entradas en los índices
+# y sus respuestas ya codificadas en la caché.
+def build_catalog(movies, previous=None):
+    if 'indexes' in movies.meta:
+        with timer('catalog_load_phase_seconds', phase='indexes'):
+            c = load_indexes(movies)
+    else:
+        c = build_indexes(movies, previous)
+    c.update({
+        'movies': movies,
+        # Estadísticas del catálogo, calculadas al leerlo (ver compute_stats)
+        'stats': movies.meta.get('stats', {}),
+        # Caché de respuestas ya codificadas de este catálogo (se descarta junto con él al recargar)
+        'responses': {},
+        # Caché de resultados del chatbot de este catálogo
+        'query_cache': OrderedDict(),
+        'files': catalog_files_signature(),
+        'changed': len(movies),
+        'removed': 0,
+        # Tabla de títulos parecidos, se completa con build_similar
+        'similar': None,
+    })
+    if previous is not None:
+        old_positions, same, _ = match_previous(movies, c['fingerprints'], previous)
+        c['changed'] = int(len(same) - same.sum())
+        c['removed'] = int(len(previous['movies']) - (old_positions >= 0).sum())
+        # Películas sin cambios: conservamos sus respuestas ya codificadas
+        for key, body in previous['responses'].items():
+            if isinstance(key, tuple) and key[0] == 'movie':
+                position = position_of(c['id_index'], key[1])
+                if position is not None and same[position]:
+                    c['responses'][key] = body
+    return c
+
+# Calcula la tabla de títulos parecidos del catálogo (ver similar.py).
+# Si el catálogo viene del snapshot, la tabla ya está guardada en el mismo archivo y solo la leemos (compartida entre
+# procesos, como el resto del snapshot). Si no, la calculamos: con el catálogo anterior solo se recalculan las películas
+# nuevas o modificadas y las que tenían como vecina a una de ellas.
+def build_similar(c, previous=None):
+    movies = c['movies']
+    if 'similar.positions' in movies.arrays:
+        c['similar'] = {'positions': movies.arrays['similar.positions'], 'scores': movies.arrays['similar.scores'],
+                        'model': None}
+        return
+    with timer('catalog_load_phase_seconds', phase='similar'):
+        table = old_to_new = changed = None
+        if previous is not None and previous['similar'] is not None:
+            _, same, old_to_new = match_previous(movies, c['fingerprints'], previous)
+            changed = ~same
+            table = previous['similar']
+            # Si nada cambió y las películas siguen en el mismo orden, la tabla anterior sirve tal cual
+            if not changed.any() and np.array_equal(old_to_new, np.arange(len(movies))):
+                c['similar'] = table
+                return
+        c['similar'] = similar.build_table(movies.column('overview'), movies.column('category'), movies.column('cast'),
+                                           table, old_to_new, changed)
+
+# Tiempos de arranque (en milisegundos) para saber cuánto tarda en estar lista la API
+startup_stats = {}
+start = time.perf_counter()
 
 # Cargamos las películas al iniciar la API para no leer el archivo cada vez que alguien pregunte por ellas.
-movies_list = load_movies()
+movies = load_movies()
+startup_stats['load_ms'] = round((time.perf_counter() - start) * 1000, 1)
+# Construimos los índices una sola vez, junto con el catálogo.
+# Las rutas siempre leen el catálogo desde esta variable: al recargar se reemplaza completo de una sola vez.
+catalog = build_catalog(movies)
+build_similar(catalog)
+startup_stats['startup_ms'] = round((time.perf_counter() - start) * 1000, 1)
+print(f"Catálogo listo: {len(movies)} títulos desde {startup_stats['catalog_source']} "
+      f"(carga {startup_stats['load_ms']} ms, total con índices {startup_stats['startup_ms']} ms)")
 
-# Función para encontrar sinónimos de una palabra (word)
-def get_synonyms(word):
+# Evita que dos recargas se ejecuten al mismo tiempo
+reload_lock = threading.Lock()
+
+# Vuelve a cargar el catálogo y todos sus índices en segundo plano y luego lo reemplaza de una sola vez,
+# así las peticiones en curso siguen usando el catálogo anterior completo y nunca ven uno a medio construir.
+def reload_catalog():
+    global catalog
+    if not reload_lock.acquire(blocking=False):
+        return None
+    try:
+        start = time.perf_counter()
+        new_catalog = build_catalog(load_movies(), previous=catalog)
+        build_similar(new_catalog, previous=catalog)
+        catalog = new_catalog
+        print(f"Catálogo recargado: {len(new_catalog['movies'])} títulos, {new_catalog['changed']} nuevos o modificados, "
+              f"{new_catalog['removed']} eliminados ({(time.perf_counter() - start) * 1000:.1f} ms)")
+        return new_catalog
+    finally:
+        reload_lock.release()
+
+# Revisa cada cierto tiempo si cambiaron los archivos del catálogo y, si es así, lo recarga
+def watch_catalog(interval, stop):
+    while not stop.wait(interval):
+        try:
+            if catalog_files_signature() != catalog['files']:
+                reload_catalog()
+        except Exception as e:
+            print(f"Error al recargar el catálogo: {e}")
+
+# Busca las posiciones de las películas cuyo título contiene la palabra como subcadena (comportamiento original)
+# El texto de los títulos son bytes (un arreglo que puede venir del mmap): lo recorremos con una expresión regular
+# que busca la palabra tal cual, sin copiar el texto
+def search_substring(title_index, word):
+    text, starts = memoryview(title_index['text']), title_index['starts']
+    pattern = re.compile(re.escape(word.encode('utf-8')))
+    found = set()
+    match = pattern.search(text)
+    while match is not None:
+        # La búsqueda binaria nos dice a qué título pertenece la posición encontrada
+        i = int(np.searchsorted(starts, match.start(), side='right')) - 1
+        found.add(i)
+        # Saltamos al inicio del siguiente título, ya sabemos que este coincide
+        match = pattern.search(text, int(starts[i + 1])) if i + 1 < len(starts) else None
+    return found
+
+# Busca las posiciones de las películas cuyo título contiene la palabra completa
+def search_token(title_index, word):
+    # Los sinónimos compuestos de WordNet vienen unidos por "_" (por ejemplo "ice_cream"):
+    # exigimos que el título tenga todas sus partes (intersección)
+    parts = re.findall(r'\w+', word.replace('_', ' '))
+    if not parts:
+        return set()
+    return set.intersection(*(set(postings(title_index, p).tolist()) for p in parts))
+
+# Archivo con la tabla de sinónimos precalculada (se genera con: python main.py synonyms)
+SYNONYMS_PATH = './dataset/synonyms.json.gz'
+
+# Función para encontrar sinónimos de una palabra (word) consultando WordNet
+def wordnet_synonyms(word):
     synonyms = set()
     for syn in wordnet.synsets(word):
         for lemma in syn.lemmas():
             synonyms.add(lemma.name().lower())
     return synonyms
 
+# Archivos de WordNet con las formas irregulares de cada tipo de palabra ("children" -> "child", "went" -> "go")
+WORDNET_EXCEPTION_FILES = {'n': 'noun.exc', 'v': 'verb.exc', 'a': 'adj.exc', 'r': 'adv.exc'}
+
+# Paso previo (fuera de línea): guarda comprimidos los sinónimos de WordNet que le sirven al chatbot,
+# para que la API no tenga que cargar WordNet al atender consultas. La tabla tiene:
+# - synonyms: para cada tipo de palabra (sustantivo, verbo, adjetivo, adverbio), cada palabra base de WordNet
+#   con sus sinónimos, dejando solo los que pueden encontrar algo en el catálogo.
+# - rules y exceptions: las reglas con que WordNet pasa una palabra a su forma base ("cars" -> "car"),
+#   así una palabra de la consulta encuentra los mismos sinónimos que consultando WordNet directamente.
+def build_synonyms_table(path=SYNONYMS_PATH):
+    records = read_movies_csv()
+    titles = '\n'.join(str(r['title']).lower() for r in records)
+    vocabulary = set(re.findall(r'\w+', titles + '\n' + '\n'.join(str(r['overview']).lower() for r in records)))
+
+    # Un sinónimo le sirve al chatbot si aparece dentro de algún título (match=substring)
+    # o si alguna de sus palabras está en los títulos o descripciones (match=token y búsqueda por relevancia)
+    @lru_cache(maxsize=None)
+    def useful(name):
+        return name in titles or any(part in vocabulary for part in re.findall(r'\w+', name.replace('_', ' ')))
+
+    # Sinónimos de cada palabra base según su tipo: los nombres de todos los grupos de sinónimos (synsets) que la contienen
+    synonyms = {pos: {} for pos in WORDNET_EXCEPTION_FILES}
+    for synset in wordnet.all_synsets():
+        # Los adjetivos "satélite" (s) se buscan junto con los demás adjetivos
+        pos = 'a' if synset.pos() == 's' else synset.pos()
+        names = {lemma.name().lower() for lemma in synset.lemmas()}
+        for name in names:
+            synonyms[pos].setdefault(name, set()).update(n for n in names if useful(n))
+    synonyms = {pos: {name: sorted(values) for name, values in entries.items() if values}
+                for pos, entries in synonyms.items()}
+
+    rules = {pos: wordnet.MORPHOLOGICAL_SUBSTITUTIONS[pos] for pos in WORDNET_EXCEPTION_FILES}
+    exceptions = {}
+    for pos, filename in WORDNET_EXCEPTION_FILES.items():
+        exceptions[pos] = {}
+        with wordnet.open(filename) as f:
+            for line in f:
+                form, *bases = line.split()
+                # Guardamos la excepción si lleva a alguna palabra de la tabla o si evita aplicar reglas que sí lo harían
+                kept = [b for b in bases if b in synonyms[pos]]
+                if kept or any(base in synonyms[pos] for base in apply_wordnet_rules(rules[pos], form)):
+                    exceptions[pos][form] = kept
+
+    table = {'synonyms': synonyms, 'rules': rules, 'exceptions': exceptions}
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump(table, f, ensure_ascii=False, separators=(',', ':'))
+    return table
+
+# Formas base posibles de una palabra según las reglas de WordNet para un tipo de palabra ("movies" -> "movie")
+def apply_wordnet_rules(rules, word):
+    return [word[:-len(old)] + new for old, new in rules if word.endswith(old)]
+
+# Sinónimos de una palabra con la tabla precalculada, buscando igual que WordNet: la palabra y sus formas base
+# (por las excepciones o, si no tiene, por las reglas) en cada tipo de palabra
+def table_synonyms(table, word):
+    word = word.lower()
+    synonyms = set()
+    for pos, entries in table['synonyms'].items():
+        exceptions = table['exceptions'][pos]
+        forms = exceptions[word] if word in exceptions else apply_wordnet_rules(table['rules'][pos], word)
+        for form in [word] + forms:
+            synonyms.update(entries.get(form, ()))
+    return synonyms
+
+# Carga la tabla de sinónimos precalculada; si no existe (o tiene el formato anterior) devolvemos None y se usará WordNet
+def load_synonyms_table(path=SYNONYMS_PATH):
+    if not os.path.exists(path):
+        return None
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        table = json.load(f)
+    return table if 'synonyms' in table else None
+
+synonyms_table = load_synonyms_table()
+
+# Función para encontrar sinónimos de una palabra (word)
+# Con la tabla precalculada bastan unos pocos accesos al diccionario; sin ella se consulta WordNet.
+# Los resultados del chatbot son los mismos en los dos casos: la tabla solo descarta sinónimos que no encuentran nada.
+# lru_cache recuerda las últimas palabras consultadas para no repetir el trabajo en cada petición.
+# Si WordNet no está instalado localmente no se descarga: la palabra simplemente no tiene sinónimos.
+@lru_cache(maxsize=4096)
+def get_synonyms(word):
+    if synonyms_table is not None:
+        return frozenset(table_synonyms(synonyms_table, word))
+    try:
+        return frozenset(wordnet_synonyms(word))
+    except LookupError:
+        return frozenset()
+
+# Convierte a bytes JSON igual que lo hace JSONResponse de FastAPI.
+# Si está instalado orjson lo usamos: escribe los bytes directamente y produce el mismo JSON compacto.
+def encode_json(content):
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+
+# Responde con bytes JSON ya codificados, sin pasar por el codificador genérico de FastAPI
+# (que recorre y copia cada diccionario antes de convertirlo)
+def json_response(content, headers=None):
+    return Response(encode_json(content), media_type='application/json', headers=headers)
+
+# Lee el parámetro fields ("id,title") de las rutas que devuelven listas de películas.
+# Devuelve los campos pedidos en el orden del catálogo, o None para enviar todos.
+def parse_fields(movies, fields):
+    if fields is None:
+        return None
+    wanted = {f.strip() for f in fields.split(',') if f.strip()}
+    unknown = wanted - set(movies.fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"campos no válidos: {', '.join(sorted(unknown))}")
+    return tuple(f for f in movies.fields if f in wanted) or None
+
+# Indica si alguna de las ETag que envía el cliente en If-None-Match coincide con las nuestras
+def etag_matches(if_none_match, etags):
+    if not if_none_match:
+        return False
+    sent = {t.strip().removeprefix('W/') for t in if_none_match.split(',')}
+    return '*' in sent or not sent.isdisjoint(etags)
+
+# Caché de respuestas ya convertidas a JSON, guardada dentro de cada catálogo (c['responses']):
+# clave -> {'body': bytes, 'gzip': bytes, 'etag': str}. Al recargar el catálogo la caché se reemplaza junto con él.
+# Responde desde la caché: la primera vez codifica el contenido (build) y guarda los bytes con su ETag.
+# Si el cliente ya tiene esa versión (If-None-Match) respondemos 304 sin cuerpo;
+# si acepta gzip enviamos la versión comprimida, que también se guarda la primera vez que se pide.
+def cached_response(c, key, build, if_none_match=None, accept_encoding=None, headers=None):
+    response_cache = c['responses']
+    entry = response_cache.get(key)
+    metrics.inc('cache_requests_total', cache='responses', result='miss' if entry is None else 'hit')
+    if entry is None:
+        body = encode_json(build())
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        entry = {'body': body, 'gzip': None, 'etag': f'"{digest}"', 'etag_gzip': f'"{digest}-gzip"'}
+        response_cache[key] = entry
+
+    use_gzip = accept_encoding is not None and 'gzip' in accept_encoding.lower() and len(entry['body']) > 1024
+    etag = entry['etag_gzip'] if use_gzip else entry['etag']
+    headers = {**(headers or {}), 'ETag': etag, 'Vary': 'Accept-Encoding'}
+
+    if etag_matches(if_none_match, (entry['etag'], entry['etag_gzip'])):
+        return Response(status_code=304, headers=headers)
+    if use_gzip:
+        if entry['gzip'] is None:
+            entry['gzip'] = gzip.compress(entry['body'], compresslevel=6)
+        return Response(entry['gzip'], media_type='application/json', headers={**headers, 'Content-Encoding': 'gzip'})
+    return Response(entry['body'], media_type='application/json', headers=headers)
+
+# Al iniciar la API arrancamos el vigilante del catálogo si se configuró CATALOG_WATCH_SECONDS (en segundos)
+@asynccontextmanager
+async def lifespan(app):
+    stop = threading.Event()
+    interval = float(os.environ.get('CATALOG_WATCH_SECONDS', '0'))
+    if interval > 0:
+        threading.Thread(target=watch_catalog, args=(interval, stop), daemon=True).start()
+    yield
+    stop.set()
+
 # Creamos la aplicación FastAPI, que será el motor de nuestra API
 # Esto inicializa la API con un nombre y una versión
-app = FastAPI(title="Mi aplicación de Películas", versión="1.0.0")
+app = FastAPI(title="Mi aplicación de Películas", versión="1.0.0", lifespan=lifespan)
+
+metrics.describe('http_request_duration_seconds', "Latencia de las peticiones por ruta, hasta enviar el final de la respuesta")
+metrics.describe('chatbot_phase_seconds', "Tiempo de cada fase del chatbot; tokenize y synonyms se miden en cada "
+                 "petición (aunque vengan de la memoria LRU), search y serialize solo si la respuesta no estaba en caché")
+metrics.describe('chatbot_results', "Cantidad de películas devueltas por el chatbot")
+metrics.describe('catalog_load_phase_seconds', "Tiempo de cada fase de la carga del catálogo")
+metrics.describe('cache_requests_total', "Consultas a las cachés de respuestas, por resultado (hit o miss)")
+
+# Se puede pedir el perfil de una petición con la cabecera X-Profile: 1 si PROFILING_ENABLED=1.
+# En ese caso la respuesta es el perfil (pilas de llamadas en formato folded) en lugar del contenido normal.
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED') == '1'
+
+# Middleware: se ejecuta en cada petición y mide cuánto tarda, agrupando por ruta, método y código de estado.
+# Es un middleware ASGI (recibe los mensajes que se envían al cliente) para detener el reloj cuando se envía el final
+# del cuerpo y no cuando salen las cabeceras: en las respuestas por partes (format=ndjson) las películas se convierten
+# a JSON después de enviar las cabeceras.
+class MeasureRequests:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        profiler = None
+        if PROFILING_ENABLED and Headers(scope=scope).get('x-profile') == '1':
+            profiler = metrics.SamplingProfiler(scope).__enter__()
+        start = time.perf_counter()
+        end = None
+        status = 500
+
+        async def send_measured(message):
+            nonlocal end, status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body' and not message.get('more_body', False):
+                end = time.perf_counter()
+            # Con el perfilador descartamos la respuesta normal: se envía el perfil al terminar
+            if profiler is None:
+                await send(message)
+
+        try:
+            await self.app(scope, receive, send_measured)
+        finally:
+            if profiler is not None:
+                profiler.__exit__(None, None, None)
+            route = scope.get('route')
+            metrics.observe('http_request_duration_seconds', (end or time.perf_counter()) - start,
+                            method=scope['method'], route=route.path if route is not None else 'sin_ruta', status=status)
+        if profiler is not None:
+            await PlainTextResponse(profiler.folded())(scope, receive, send)
+
+app.add_middleware(MeasureRequests)
 
 # Ruta de inicio: Cuando alguien entra a la API sin especificar nada, verá un mensaje de bienvenda
 @app.get('/', tags=['Home'])
@@ -57,65 +974,350 @@ def home():
 # Obteniendo la lista de películas
 # Creamos una ruta para obtener todas las películas
 # Ruta para obtener todas las películas disponibles
-
+# Sin parámetros devuelve todo el catálogo como antes. Con limit se pagina: offset indica desde qué posición empezar
+# y cursor el ID de la última película recibida; la cabecera X-Next-Cursor trae el cursor de la página siguiente.
+# Con format=ndjson las películas se envían una por línea a medida que se convierten a JSON.
+# Con fields (por ejemplo fields=id,title) solo se envían esos campos de cada película.
 @app.get('/movies', tags=['Movies'])
-def get_movies():
-    # Si hay películas, las enviamos, si no, mostramos un error
-    return movies_list or HTTPException(status_code=500, detail="No hay datos de películas disponibles")
+def get_movies(limit: int | None = Query(None, ge=1, le=1000), offset: int = Query(0, ge=0),
+               cursor: str | None = None, format: Literal['json', 'ndjson'] = 'json', fields: str | None = None,
+               if_none_match: str | None = Header(None), accept_encoding: str | None = Header(None)):
+    # Tomamos el catálogo actual una sola vez: si se recarga durante la petición seguimos usando el mismo
+    c = catalog
+    movies_list = c['movies']
+    # Si no hay películas, mostramos un error
+    if not movies_list:
+        raise HTTPException(status_code=500, detail="No hay datos de películas disponibles")
+    fields = parse_fields(movies_list, fields)
+
+    # El cursor es el ID de la última película vista: seguimos justo después de ella
+    if cursor is not None:
+        position = position_of(c['id_index'], cursor)
+        if position is None:
+            raise HTTPException(status_code=400, detail="cursor no válido")
+        offset = position + 1
+    end = len(movies_list) if limit is None else min(offset + limit, len(movies_list))
+
+    headers = {"X-Total-Count": str(len(movies_list))}
+    if limit is not None and offset < end < len(movies_list):
+        headers["X-Next-Cursor"] = movies_list[end - 1]['id']
+
+    if format == 'ndjson':
+        return StreamingResponse(stream_ndjson(movies_list, range(offset, end), fields),
+                                 media_type='application/x-ndjson', headers=headers)
+    # Sin paginación ni streaming enviamos el catálogo completo ya codificado desde la caché.
+    # Solo guardamos la respuesta con todos los campos: con fields habría una copia del catálogo por cada
+    # combinación de campos pedida, así que esas se arman en cada petición (leyendo solo esas columnas).
+    if limit is None and offset == 0 and fields is None:
+        return cached_response(c, 'movies', lambda: movies_list.records(range(len(movies_list))),
+                               if_none_match, accept_encoding, headers)
+    return json_response(movies_list.records(range(offset, end), fields), headers)
+
+# Genera las películas en formato NDJSON (una por línea), en bloques para no escribir línea por línea en el socket
+def stream_ndjson(movies, positions, fields=None, chunk_size=500):
+    for start in range(0, len(positions), chunk_size):
+        yield b''.join(encode_json(m) + b'\n' for m in movies.records(positions[start:start + chunk_size], fields))
 
 # Ruta para obtener una película específica según su ID
 @app.get('/movies/{id}', tags=['Movies'])
-def get_movie(id : str):
-    # Buscamos en la lista de películas la que tenga el mismo ID
-    return next((m for m in movies_list if m['id'] == id), {"detalle": "película no encontrada"})
+def get_movie(id : str, if_none_match: str | None = Header(None), accept_encoding: str | None = Header(None)):
+    # Tomamos el catálogo actual una sola vez: si se recarga durante la petición seguimos usando el mismo
+    c = catalog
+    movies_list = c['movies']
+    # Buscamos en el índice de IDs la posición de la película con ese ID
+    position = position_of(c['id_index'], id)
+    # Si no existe respondemos con un error 404
+    if position is None:
+        raise HTTPException(status_code=404, detail="película no encontrada")
+    return cached_response(c, ('movie', id), lambda: movies_list[position], if_none_match, accept_encoding)
 
-# Ruta del chatbot que responde con películas según palabras clave de la categoría
-@app.get("/chatbot", tags=["Chatbot"])
-def chatbot(query: str):
+# Ruta para obtener varias películas en una sola petición, enviando la lista de IDs en el cuerpo
+@app.post('/movies/batch', tags=['Movies'])
+def get_movies_batch(ids: list[str] = Body(..., max_length=1000), fields: str | None = None):
+    # Tomamos el catálogo actual una sola vez: si se recarga durante la petición seguimos usando el mismo
+    c = catalog
+    movies_list = c['movies']
+    fields = parse_fields(movies_list, fields)
+    # Respetamos el orden pedido e informamos cuáles IDs no existen
+    positions = positions_of(c['id_index'], ids).tolist()
+    movies = movies_list.records([p for p in positions if p >= 0], fields)
+    missing = [i for i, p in zip(ids, positions) if p < 0]
+    return json_response({"películas": movies, "no_encontradas": missing})
+
+# Ruta de recomendaciones: las películas más parecidas a una por su descripción, géneros y actores.
+# La tabla de vecinos se calcula al cargar el catálogo, así cada petición es solo una búsqueda en ella.
+@app.get('/movies/{id}/similar', tags=['Movies'])
+def get_similar_movies(id: str, k: int = Query(10, ge=1, le=similar.K), fields: str | None = None):
+    c = catalog
+    movies_list, table = c['movies'], c['similar']
+    fields = parse_fields(movies_list, fields)
+    position = position_of(c['id_index'], id)
+    if position is None:
+        raise HTTPException(status_code=404, detail="película no encontrada")
+    if table is None:
+        raise HTTPException(status_code=503, detail="las recomendaciones todavía no están listas")
+    # Descartamos los vecinos sin nada en común (puntaje 0)
+    neighbours = [(int(i), float(score)) for i, score in zip(table['positions'][position][:k], table['scores'][position][:k])
+                  if score > 0]
+    results = movies_list.records([i for i, _ in neighbours], fields)
+    for movie, (_, score) in zip(results, neighbours):
+        movie['similitud'] = round(score, 3)
+    return json_response({"películas": results})
+
+# Separa la consulta en palabras.
+# Se memoriza por consulta normalizada, así las consultas repetidas no vuelven a tokenizar.
+# Los tiempos se miden en chatbot, fuera de la memoria, así cada petición cuenta en cada fase aunque no repita el trabajo.
+@lru_cache(maxsize=4096)
+def tokenize_query(query):
     try:
         # Intentamos tokenizar con word_tokenize
-        query_words = word_tokenize(query.lower())
+        query_words = word_tokenize(query)
     except LookupError:
         # Si falla, usamos un método más simple
-        query_words = query.lower().split()
-
-    # Obtenemos sinónimos para cada palabra
-    synonyms = {word for q in query_words for word in get_synonyms(q)} | set(query_words)
-
-    # Validamos que la película tenga categoría y buscamos coincidencias
-    results = [m for m in movies_list if any(s in m["title"].lower() for s in synonyms)]
-
-    return JSONResponse(content={
-        "respuesta": "Aquí tienes algunas películas relacionadas." if results else "No encontré películas en esa categoría.",
-        "películas": results
-    })
-
+        query_words = query.split()
+    return frozenset(query_words)
 
+# Agrega a las palabras de la consulta los sinónimos de cada una (también se memoriza)
+@lru_cache(maxsize=4096)
+def expand_query(query_words):
+    return frozenset({word for q in query_words for word in get_synonyms(q)} | query_words)
 
-# Ruta para buscar películas por categoría específica
-@app.get ('/movies/by_category/', tags=[ 'Movies'])
-def get_movies_by_category( category: str):
-    # Filtramos la lista de películas según la categoría ingresada
-    return [m for m in movies_list if category.lower() in m['category'] .lower()]
+# Caché de resultados del chatbot con límite de tamaño (se descartan las menos usadas) y de tiempo (en segundos).
+# Vive dentro de cada catálogo (c['query_cache']), así que al recargarlo empieza vacía.
+QUERY_CACHE_SIZE = int(os.environ.get('CHATBOT_CACHE_SIZE', '1024'))
+QUERY_CACHE_TTL = float(os.environ.get('CHATBOT_CACHE_TTL', '300'))
+query_cache_lock = threading.Lock()
 
+# Busca una respuesta en la caché; si venció la descartamos
+def query_cache_get(cache, key):
+    with query_cache_lock:
+        entry = cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            cache.move_to_end(key)
+            metrics.inc('cache_requests_total', cache='chatbot', result='hit')
+            return entry[1]
+        if entry is not None:
+            del cache[key]
+        metrics.inc('cache_requests_total', cache='chatbot', result='miss')
+        return None
 
+# Guarda una respuesta y, si la caché se llenó, elimina la que lleva más tiempo sin usarse
+def query_cache_put(cache, key, value):
+    with query_cache_lock:
+        cache[key] = (time.monotonic() + QUERY_CACHE_TTL, value)
+        cache.move_to_end(key)
+        while len(cache) > QUERY_CACHE_SIZE:
+            cache.popitem(last=False)
 
+# Ruta del chatbot que responde con películas según palabras clave de la categoría
+# Con k se activa la búsqueda por relevancia: se buscan las palabras y sinónimos en el título y la descripción,
+# y se devuelven solo las k películas con mejor puntaje, ordenadas de mayor a menor.
+@app.get("/chatbot", tags=["Chatbot"])
+def chatbot(query: str, match: Literal['substring', 'token'] = 'substring', k: int | None = Query(None, ge=1, le=100),
+            fields: str | None = None):
+    c = catalog
+    fields = parse_fields(c['movies'], fields)
+    # Normalizamos la consulta (minúsculas y espacios) antes de expandirla
+    with timer('chatbot_phase_seconds', phase='tokenize'):
+        query_words = tokenize_query(' '.join(query.lower().split()))
+    # Obtenemos sinónimos para cada palabra
+    with timer('chatbot_phase_seconds', phase='synonyms'):
+        synonyms = expand_query(query_words)
 
+    # La clave de la caché es el conjunto de palabras y sinónimos, así las consultas que solo cambian en mayúsculas,
+    # espacios u orden de las palabras ("Love Story" y "story love") comparten la misma respuesta.
+    # En la búsqueda por relevancia las palabras escritas pesan más, así que también forman parte de la clave.
+    # Con fields la respuesta cambia, así que también forma parte de la clave.
+    key = ((synonyms, match) if k is None else (synonyms, query_words, k)) + ((fields,) if fields else ())
+    body = query_cache_get(c['query_cache'], key)
+    if body is not None:
+        return Response(body, media_type='application/json', headers={'X-Cache': 'HIT'})
 
+    with timer('chatbot_phase_seconds', phase='search'):
+        if k is not None:
+            # Las palabras escritas por el usuario valen el doble que sus sinónimos;
+            # los sinónimos compuestos ("ice_cream") se separan en sus partes
+            weighted_terms = {}
+            for s in synonyms:
+                for part in re.findall(r'\w+', s.replace('_', ' ')):
+                    weighted_terms[part] = max(weighted_terms.get(part, 0), 0.5)
+            for q in query_words:
+                for part in re.findall(r'\w+', q):
+                    weighted_terms[part] = 1.0
+            positions = search_ranked(c['search_index'], weighted_terms, k)
+        else:
+            # Buscamos en el índice: cada sinónimo devuelve un conjunto de películas y las unimos.
+            # Con match='substring' la palabra puede aparecer dentro de otra (como antes); con match='token' debe ser una palabra completa
+            search = search_substring if match == 'substring' else search_token
+            found = set().union(*(search(c['title_index'], s) for s in synonyms if s))
+            # Ordenamos las posiciones para conservar el orden del catálogo
+            positions = sorted(found)
+    metrics.observe('chatbot_results', len(positions), buckets=metrics.SIZE_BUCKETS)
 
+    with timer('chatbot_phase_seconds', phase='serialize'):
+        results = c['movies'].records(positions, fields)
+        body = encode_json({
+            "respuesta": "Aquí tienes algunas películas relacionadas." if results else "No encontré películas en esa categoría.",
+            "películas": results
+        })
+    query_cache_put(c['query_cache'], key, body)
+    return Response(body, media_type='application/json', headers={'X-Cache': 'MISS'})
 
+# Búsqueda aproximada de títulos: encuentra "Stranger Things" aunque se escriba "stanger things".
+# Devuelve las k películas con título más parecido y su similitud (de 0 a 1), descartando las que no llegan al umbral.
+@app.get('/search', tags=['Search'])
+def fuzzy_search(q: str = Query(..., min_length=1), k: int = Query(10, ge=1, le=100),
+                 threshold: float = Query(0.3, gt=0, le=1), fields: str | None = None):
+    c = catalog
+    fields = parse_fields(c['movies'], fields)
+    matches = search_fuzzy(c['trigram_index'], q, k, threshold)
+    results = c['movies'].records([i for i, _ in matches], fields)
+    for movie, (_, score) in zip(results, matches):
+        movie['similitud'] = round(score, 3)
+    return json_response({
+        "respuesta": "Aquí tienes los títulos más parecidos." if results else "No encontré títulos parecidos.",
+        "películas": results
+    })
 
+# Autocompletado para el cuadro de búsqueda: títulos con alguna palabra que empiece con el prefijo
+# (también varias palabras: "stranger th"), los estrenos más recientes primero.
+# No tokeniza ni busca sinónimos, así responde en menos de un milisegundo en cada tecla.
+@app.get('/autocomplete', tags=['Search'])
+def autocomplete(prefix: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=50)):
+    c = catalog
+    movies_list = c['movies']
+    suggestions = []
+    for i in search_prefix(c['autocomplete_index'], prefix, limit):
+        movie = movies_list[i]
+        suggestions.append({'id': movie['id'], 'title': movie['title'], 'year': movie['year']})
+    return {"sugerencias": suggestions}
 
+# Rutas de estadísticas del catálogo: se calculan una sola vez al cargarlo y se sirven desde la caché de respuestas
+STATS_NAMES = Literal['genres', 'countries', 'ratings', 'types', 'years', 'directors', 'durations']
 
+@app.get('/stats', tags=['Stats'])
+def get_stats(if_none_match: str | None = Header(None), accept_encoding: str | None = Header(None)):
+    c = catalog
+    # Resumen: los 15 primeros de cada lista
+    def summary():
+        return {name: (value[:15] if isinstance(value, list) else value) for name, value in c['stats'].items()}
+    return cached_response(c, ('stats',), summary, if_none_match, accept_encoding)
 
+# limit recorta las listas (por ejemplo los 10 países con más títulos).
+# En la caché solo guardamos la lista completa: las listas recortadas se arman en cada petición, así un cliente que
+# pide muchos valores distintos de limit no llena la caché con una respuesta por cada uno.
+@app.get('/stats/{name}', tags=['Stats'])
+def get_stats_by_name(name: STATS_NAMES, limit: int | None = Query(None, ge=1),
+                      if_none_match: str | None = Header(None), accept_encoding: str | None = Header(None)):
+    c = catalog
+    value = c['stats'].get(name)
+    if value is None:
+        raise HTTPException(status_code=404, detail="estadística no disponible")
+    if limit is not None and isinstance(value, list) and limit < len(value):
+        return json_response(value[:limit])
+    return cached_response(c, ('stats', name), lambda: value, if_none_match, accept_encoding)
 
+# Ruta con las métricas de este proceso en formato de texto de Prometheus
+@app.get('/metrics', tags=['Metrics'])
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
 
+# Ruta de administración para recargar el catálogo sin reiniciar la API.
+# Solo funciona si se define la variable de entorno ADMIN_TOKEN y se envía el mismo valor en la cabecera X-Admin-Token.
+@app.post('/admin/reload', tags=['Admin'], status_code=202)
+def admin_reload(background_tasks: BackgroundTasks, x_admin_token: str | None = Header(None)):
+    token = os.environ.get('ADMIN_TOKEN')
+    # compare_digest tarda lo mismo sin importar dónde difieren, así no se puede adivinar el token por el tiempo
+    if not token or not hmac.compare_digest(x_admin_token or '', token):
+        raise HTTPException(status_code=403, detail="no autorizado")
+    if reload_lock.locked():
+        return {"detalle": "ya hay una recarga en curso"}
+    # La recarga se hace después de responder, sin bloquear esta petición
+    background_tasks.add_task(reload_catalog)
+    return {"detalle": "recarga del catálogo iniciada"}
 
 
 
+# Ruta para buscar películas por categoría específica
+# Se puede repetir el parámetro (?category=Dramas&category=Comedies) y elegir si deben cumplirse todos (and) o alguno (or)
+# Con fields (por ejemplo fields=id,title) solo se envían esos campos de cada película.
+@app.get ('/movies/by_category/', tags=[ 'Movies'])
+def get_movies_by_category(category: list[str] = Query(...), mode: Literal['and', 'or'] = 'or', fields: str | None = None,
+                           if_none_match: str | None = Header(None), accept_encoding: str | None = Header(None)):
+    # Tomamos el catálogo actual una sola vez: si se recarga durante la petición seguimos usando el mismo
+    c = catalog
+    movies_list, genre_index = c['movies'], c['genre_index']
+    fields = parse_fields(movies_list, fields)
+    # Normalizamos los géneros pedidos igual que los del catálogo (también se aceptan separados por comas)
+    wanted = set().union(*(parse_genres(name) for name in category))
+    # Un solo género: la respuesta ya está precalculada y se sirve codificada desde la caché
+    # (solo con todos los campos, igual que en /movies: con fields se arma en cada petición)
+    if len(wanted) == 1:
+        genre = wanted.pop()
+        if genre not in genre_index['vocabulary']:
+            return []
+        positions = postings(genre_index, genre).tolist()
+        if fields is not None:
+            return json_response(movies_list.records(positions, fields))
+        return cached_response(c, ('genre', genre), lambda: movies_list.records(positions),
+                               if_none_match, accept_encoding)
+    # Varios géneros: intersección (and) o unión (or) de los conjuntos del índice
+    found_per_genre = [set(postings(genre_index, g).tolist()) for g in wanted]
+    if not found_per_genre:
+        return []
+    found = set.intersection(*found_per_genre) if mode == 'and' else set.union(*found_per_genre)
+    return json_response(movies_list.records(sorted(found), fields))
 
 
+# Ruta para buscar películas combinando filtros: tipo, clasificación, país y género (se pueden repetir; basta con
+# cumplir uno de los valores de cada filtro), rango de año de estreno y rango de fecha en que se agregó a Netflix.
+# Además de la página de resultados devuelve, para cada filtro, cuántas de las películas encontradas tienen cada valor.
+@app.get('/movies/query/', tags=['Movies'])
+def query_movies(type: list[str] | None = Query(None), rating: list[str] | None = Query(None),
+                 country: list[str] | None = Query(None), genre: list[str] | None = Query(None),
+                 year_from: int | None = None, year_to: int | None = None,
+                 added_from: date | None = None, added_to: date | None = None,
+                 limit: int = Query(100, ge=1, le=1000), offset: int = Query(0, ge=0), fields: str | None = None):
+    c = catalog
+    facet_index = c['facet_index']
+    fields = parse_fields(c['movies'], fields)
+    # Normalizamos los valores pedidos (minúsculas; también se aceptan separados por comas)
+    requested = {'type': type, 'rating': rating, 'country': country, 'genre': genre}
+    filters = {field: {v.strip().lower() for value in values for v in value.split(',') if v.strip()}
+               for field, values in requested.items() if values}
+    # Las fechas se comparan como números AAAAMMDD; las películas sin fecha quedan fuera si se filtra por fecha
+    def as_number(day):
+        return None if day is None else day.year * 10000 + day.month * 100 + day.day
+    ranges = [(facet_index['years'], year_from, year_to)]
+    if added_from is not None or added_to is not None:
+        ranges.append((facet_index['dates'], as_number(added_from) or 1, as_number(added_to)))
 
+    positions, counts = query_facets(facet_index, filters, ranges)
+    return json_response({
+        "cantidad": len(positions),
+        "películas": c['movies'].records(positions[offset:offset + limit].tolist(), fields),
+        "facetas": counts,
+    })
 
 
+# Comandos de preparación que se ejecutan antes de iniciar la API, por ejemplo:
+#   python main.py prepare    -> descarga los recursos de NLTK, genera el snapshot del catálogo y la tabla de sinónimos
+#   python main.py snapshot   -> solo genera el snapshot del catálogo
+#   python main.py synonyms   -> solo genera la tabla de sinónimos precalculada
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Tareas de preparación de la API de películas")
+    parser.add_argument('command', choices=['prepare', 'snapshot', 'synonyms'])
+    args = parser.parse_args()
 
+    if args.command == 'prepare':
+        download_nltk_resources()
+        print("Recursos de NLTK descargados")
+    if args.command in ('prepare', 'snapshot'):
+        # Al importar este archivo ya se cargó el catálogo con su tabla de títulos parecidos:
+        # la usamos como catálogo anterior, así la tabla solo se recalcula para las películas que cambiaron
+        save_snapshot(*read_catalog_csv(), previous=catalog)
+        print(f"Snapshot del catálogo guardado en {SNAPSHOT_PATH}")
+    if args.command in ('prepare', 'synonyms'):
+        table = build_synonyms_table()
+        print(f"Tabla de sinónimos guardada en {SYNONYMS_PATH} "
+              f"({sum(len(entries) for entries in table['synonyms'].values())} palabras)")
@@ -0,0 +1,158 @@
+"""
+Métricas de la API en formato de texto de Prometheus.
+
+- Contadores: cuántas veces pasó algo (por ejemplo aciertos de la caché).
+- Histogramas: cómo se distribuyen los valores observados (por ejemplo la latencia de cada ruta), agrupados en intervalos.
+- Temporizadores por fase: miden cuánto tarda cada parte de una operación (tokenizar, buscar sinónimos, etc.).
+- Perfilador por muestreo: mientras atiende una petición mira cada milisegundo qué está ejecutando el hilo que la atiende
+  y cuenta cuántas veces aparece cada pila de llamadas.
+
+Las métricas son de cada proceso: con varios workers, cada uno tiene las suyas.
+"""
+
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Intervalos de latencia en segundos (de medio milisegundo a 5 segundos)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Intervalos para la cantidad de resultados de una búsqueda
+SIZE_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+
+_lock = threading.Lock()
+# (nombre, etiquetas) -> valor
+_counters = {}
+# (nombre, etiquetas) -> {'buckets': [...], 'counts': [...], 'sum': float, 'count': int}
+_histograms = {}
+# nombre -> texto de ayuda
+_help = {}
+
+
+def describe(name, text):
+    _help[name] = text
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    key = (name, _labels(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {'buckets': buckets, 'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(histogram['buckets']):
+            if value <= bound:
+                histogram['counts'][i] += 1
+                break
+        histogram['sum'] += value
+        histogram['count'] += 1
+
+
+# Mide cuánto tarda el bloque "with" y lo guarda en el histograma indicado, por ejemplo:
+#   with timer('chatbot_phase_seconds', phase='synonyms'): ...
+@contextmanager
+def timer(name, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in items)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + '}'
+
+
+# Genera el texto que lee Prometheus al consultar /metrics
+def render():
+    lines = []
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, dict(h, counts=list(h['counts']))) for key, h in _histograms.items())
+
+    current = None
+    for (name, labels), value in counters:
+        if name != current:
+            current = name
+            if name in _help:
+                lines.append(f'# HELP {name} {_help[name]}')
+            lines.append(f'# TYPE {name} counter')
+        lines.append(f'{name}{_format_labels(labels)} {value}')
+
+    current = None
+    for (name, labels), histogram in histograms:
+        if name != current:
+            current = name
+            if name in _help:
+                lines.append(f'# HELP {name} {_help[name]}')
+            lines.append(f'# TYPE {name} histogram')
+        cumulative = 0
+        for bound, count in zip(histogram['buckets'], histogram['counts']):
+            cumulative += count
+            lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+        lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {histogram["count"]}')
+        lines.append(f'{name}_sum{_format_labels(labels)} {histogram["sum"]}')
+        lines.append(f'{name}_count{_format_labels(labels)} {histogram["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+# Perfilador por muestreo de una petición: cada "interval" segundos mira qué está ejecutando el hilo que atiende la
+# petición y cuenta cuántas veces aparece cada pila de llamadas.
+# Recibe el scope de la petición: cuando el enrutador elige la ruta guarda ahí la función que la atiende (endpoint),
+# y solo se cuentan los hilos que están ejecutando esa función, desde ella hacia adentro. Así no se mezclan los hilos
+# que atienden otras peticiones ni los que esperan sin hacer nada (servidor, vigilante del catálogo, ...).
+# El resultado está en formato "folded" (una pila por línea, con ";" entre funciones y la cantidad de muestras al final),
+# que se puede abrir con speedscope o flamegraph.pl.
+class SamplingProfiler:
+    def __init__(self, scope, interval=0.001):
+        self.scope = scope
+        self.interval = interval
+        self.samples = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            endpoint = getattr(self.scope.get('endpoint'), '__code__', None)
+            if endpoint is None:
+                # Todavía no se eligió la ruta
+                continue
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                stack = []
+                while frame is not None and frame.f_code is not endpoint:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                if frame is None:
+                    # Este hilo no está atendiendo la petición
+                    continue
+                stack.append(frame.f_code)
+                key = ';'.join(f'{os.path.basename(code.co_filename)}:{code.co_name}' for code in reversed(stack))
+                self.samples[key] = self.samples.get(key, 0) + 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in sorted(self.samples.items(), key=lambda x: -x[1]))
@@ -0,0 +1,189 @@
+"""
+Títulos parecidos: para cada película, la lista de las K películas más similares, calculada una sola vez.
+
+La similitud combina tres partes, cada una como similitud del coseno entre vectores normalizados:
+- Descripción: TF-IDF de sus palabras (las palabras raras pesan más; las muy comunes como "the" se ignoran).
+- Géneros compartidos.
+- Actores compartidos.
+
+Los puntajes de todas las películas contra todas se calculan por bloques de filas con multiplicaciones de matrices
+(dispersas para la descripción y los actores, densa para los géneros), repartiendo los bloques entre varios hilos.
+Usamos hilos y no procesos porque SciPy y NumPy liberan el GIL durante estas operaciones: los hilos trabajan en paralelo
+sobre las mismas matrices sin copiarlas, y no hace falta volver a importar la API (y cargar el catálogo) en cada proceso.
+De cada bloque solo se guardan los K mejores, así la tabla final ocupa K posiciones y K puntajes por película.
+
+Al recargar el catálogo la tabla se actualiza: solo se recalculan las películas nuevas o modificadas y las que
+tenían como vecina a una película que cambió o se eliminó.
+"""
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy import sparse
+
+# Peso de cada parte en la similitud final (suman 1)
+WEIGHTS = {'overview': 0.6, 'genres': 0.25, 'cast': 0.15}
+# Las palabras que aparecen en más de esta proporción de descripciones no distinguen a nadie y se ignoran
+MAX_DOCUMENT_FREQUENCY = 0.05
+# Cantidad de vecinos guardados por película
+K = 10
+# Celdas de la matriz de puntajes que se calculan a la vez, sumando todos los hilos. Cada celda ocupa unos 16 bytes
+# mientras se procesa su bloque (puntaje float32, suma de géneros y la posición int64 de argpartition): unos 256 MB en total.
+BLOCK_CELLS = 16_000_000
+# Hilos que calculan la tabla (como máximo la cantidad de CPUs). Se puede cambiar con la variable SIMILAR_WORKERS.
+MAX_WORKERS = int(os.environ.get('SIMILAR_WORKERS', '4'))
+# Si cambió más de esta proporción del catálogo se reconstruye la tabla completa (y el vocabulario)
+FULL_REBUILD_FRACTION = 0.2
+
+
+# Separa una lista de valores separados por comas ("Dramas, International Movies")
+def split_values(text):
+    return [v.strip() for v in text.split(',') if v.strip()]
+
+
+def _words(text):
+    return set(re.findall(r'\w+', text.lower()))
+
+
+# Elige el vocabulario de cada parte a partir del catálogo: palabras de la descripción con su idf, géneros y actores.
+# Las palabras y actores que aparecen en un solo título no se comparten con nadie y se descartan.
+def fit_model(overviews, genres, casts):
+    n = len(overviews)
+    word_counts = {}
+    for text in overviews:
+        for word in _words(text):
+            word_counts[word] = word_counts.get(word, 0) + 1
+    words = {w: c for w, c in word_counts.items() if 1 < c <= max(2, MAX_DOCUMENT_FREQUENCY * n)}
+
+    cast_counts = {}
+    for text in casts:
+        for name in set(split_values(text)):
+            cast_counts[name] = cast_counts.get(name, 0) + 1
+
+    return {
+        'words': {w: i for i, w in enumerate(words)},
+        'idf': np.log(n / np.array(list(words.values()), dtype=np.float64)).astype(np.float32),
+        'genres': {g: i for i, g in enumerate(sorted({g for text in genres for g in split_values(text)}))},
+        'cast': {name: i for i, name in enumerate(name for name, c in cast_counts.items() if c > 1)},
+    }
+
+
+# Matriz dispersa película x valor con los valores de cada película (los que no están en el vocabulario se ignoran)
+def _indicator(values_per_row, vocabulary, weights=None):
+    rows, cols = [], []
+    for i, values in enumerate(values_per_row):
+        for v in values:
+            j = vocabulary.get(v)
+            if j is not None:
+                rows.append(i)
+                cols.append(j)
+    data = np.ones(len(rows), dtype=np.float32) if weights is None else weights[cols]
+    return sparse.csr_matrix((data, (rows, cols)), shape=(len(values_per_row), len(vocabulary)), dtype=np.float32)
+
+
+# Normaliza cada fila a largo 1 (así el producto de dos filas es el coseno) y la multiplica por la raíz del peso,
+# así el producto de dos películas es la suma ponderada de las similitudes de cada parte
+def _normalize(matrix, weight):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags((np.sqrt(weight) / norms).astype(np.float32)) @ matrix
+
+
+# Vectores de cada película con el vocabulario del modelo:
+# X (dispersa) con la descripción y los actores, y G (densa) con los géneros, que son pocos y muy compartidos
+def featurize(model, overviews, genres, casts):
+    overview = _normalize(_indicator([_words(t) for t in overviews], model['words'], model['idf']), WEIGHTS['overview'])
+    cast = _normalize(_indicator([split_values(t) for t in casts], model['cast']), WEIGHTS['cast'])
+    genre = _normalize(_indicator([split_values(t) for t in genres], model['genres']), WEIGHTS['genres'])
+    X = sparse.hstack([overview, cast], format='csr', dtype=np.float32)
+    return X, genre.toarray()
+
+
+# Los k vecinos de las filas pedidas contra todo el catálogo: un bloque de puntajes y una selección parcial por fila
+def _top_k(X, XT, G, rows, k):
+    scores = (X[rows] @ XT).toarray()
+    genre_scores = G[rows] @ G.T
+    scores += genre_scores
+    del genre_scores
+    # Una película no es vecina de sí misma
+    scores[np.arange(len(rows)), rows] = -np.inf
+    # Cambiamos el signo en el mismo arreglo (sin otra copia) para que argpartition deje primero los puntajes más altos
+    np.negative(scores, out=scores)
+    top = np.argpartition(scores, k - 1, axis=1)[:, :k]
+    top_scores = -np.take_along_axis(scores, top, axis=1)
+    del scores
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    return np.take_along_axis(top, order, axis=1).astype(np.int32), np.take_along_axis(top_scores, order, axis=1)
+
+
+# Calcula los k vecinos de las filas pedidas por bloques; si hay varios bloques se reparten entre varios hilos.
+# BLOCK_CELLS se reparte entre los hilos, así la memoria usada no crece con la cantidad de CPUs.
+def nearest_neighbours(X, G, rows, k, workers=None):
+    n = X.shape[0]
+    workers = max(1, min(workers or MAX_WORKERS, os.cpu_count() or 1))
+    block = max(1, BLOCK_CELLS // (max(n, 1) * workers))
+    chunks = [rows[s:s + block] for s in range(0, len(rows), block)]
+    XT = X.T.tocsr()
+    workers = min(workers, len(chunks))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda chunk: _top_k(X, XT, G, chunk, k), chunks))
+    else:
+        results = [_top_k(X, XT, G, chunk, k) for chunk in chunks]
+    if not results:
+        return np.empty((0, k), dtype=np.int32), np.empty((0, k), dtype=np.float32)
+    return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results]).astype(np.float32)
+
+
+# Construye la tabla de vecinos del catálogo: {'positions': (n, k), 'scores': (n, k), 'model': ...}.
+# Con la tabla anterior (previous) solo recalcula lo necesario:
+#   old_to_new: para cada posición del catálogo anterior, su posición en el nuevo si la película no cambió (o -1)
+#   changed: para cada posición del catálogo nuevo, si la película es nueva o cambió
+def build_table(overviews, genres, casts, previous=None, old_to_new=None, changed=None, k=K, workers=None):
+    n = len(overviews)
+    k = min(k, n - 1)
+    if k < 1:
+        return {'positions': np.empty((n, 0), dtype=np.int32), 'scores': np.empty((n, 0), dtype=np.float32),
+                'model': None}
+
+    incremental = (previous is not None and previous['model'] is not None
+                   and previous['positions'].shape[1] == k and changed.sum() <= FULL_REBUILD_FRACTION * n)
+    model = previous['model'] if incremental else fit_model(overviews, genres, casts)
+    X, G = featurize(model, overviews, genres, casts)
+    if not incremental:
+        positions, scores = nearest_neighbours(X, G, np.arange(n), k, workers)
+        return {'positions': positions, 'scores': scores, 'model': model}
+
+    # Pasamos la tabla anterior a las posiciones nuevas; los vecinos eliminados o modificados quedan en -1
+    kept = old_to_new >= 0
+    positions = np.empty((n, k), dtype=np.int32)
+    scores = np.empty((n, k), dtype=np.float32)
+    positions[old_to_new[kept]] = old_to_new[previous['positions'][kept]]
+    scores[old_to_new[kept]] = previous['scores'][kept]
+
+    # Recalculamos las películas nuevas o modificadas y las que perdieron algún vecino
+    recompute = changed.copy()
+    recompute[old_to_new[kept]] |= (positions[old_to_new[kept]] < 0).any(axis=1)
+    if recompute.sum() > FULL_REBUILD_FRACTION * n:
+        return build_table(overviews, genres, casts, k=k, workers=workers)
+    rows = np.flatnonzero(recompute)
+    positions[rows], scores[rows] = nearest_neighbours(X, G, rows, k, workers)
+
+    # Las demás conservan sus vecinos, pero una película nueva o modificada puede haber quedado más cerca:
+    # comparamos sus k vecinos actuales con las películas que cambiaron y nos quedamos con los k mejores
+    new_rows = np.flatnonzero(changed)
+    stay = np.flatnonzero(~recompute)
+    if len(new_rows) and len(stay):
+        XT, GT = X[new_rows].T.tocsr(), G[new_rows].T
+        block = max(1, BLOCK_CELLS // len(new_rows))
+        for s in range(0, len(stay), block):
+            part = stay[s:s + block]
+            cross = (X[part] @ XT).toarray() + G[part] @ GT
+            candidates = np.hstack([positions[part], np.broadcast_to(new_rows, cross.shape)])
+            candidate_scores = np.hstack([scores[part], cross])
+            top = np.argsort(-candidate_scores, axis=1, kind='stable')[:, :k]
+            positions[part] = np.take_along_axis(candidates, top, axis=1)
+            scores[part] = np.take_along_axis(candidate_scores, top, axis=1)
+    return {'positions': positions, 'scores': scores, 'model': model}
@@ -0,0 +1,168 @@
+"""
+Almacén compacto del catálogo de películas.
+
+En lugar de guardar cada película como un diccionario de textos de Python, guardamos el catálogo por columnas:
+- Los textos (título, descripción, ...) van todos seguidos en un solo bloque de bytes, con la posición donde empieza cada uno.
+- Las columnas con pocos valores distintos (como la clasificación) se guardan como un número que apunta a una lista de valores.
+- Las columnas numéricas (como el año) se guardan como un arreglo de enteros.
+
+Todo se escribe en un único archivo que se abre con mmap: si varios procesos (workers de uvicorn) abren el mismo archivo,
+el sistema operativo comparte una sola copia en memoria entre todos ellos.
+
+El almacén se usa igual que la lista de diccionarios de antes: len(store), store[i], store[inicio:fin] y for m in store.
+Las columnas ocultas (por ejemplo las que solo sirven para filtrar) se guardan igual, pero no aparecen en esos
+diccionarios: solo se leen con store.column(nombre).
+"""
+
+import json
+import mmap
+import os
+
+import numpy as np
+
+# Cabecera del archivo: una marca para reconocerlo y el largo del encabezado JSON
+MAGIC = b'MOVSTOR1'
+# Alineamos cada arreglo a 64 bytes para poder leerlo directamente desde el archivo
+ALIGN = 64
+
+# Una columna de texto se vuelve categórica si tiene a lo sumo esta cantidad de valores distintos
+MAX_CATEGORIES = 1024
+
+
+class MovieStore:
+    def __init__(self, length, columns, arrays, meta=None, buffer=None):
+        self.length = length
+        # Lista de columnas en orden: {'name': ..., 'kind': 'str' | 'cat' | 'int', 'values': [...] (solo cat),
+        # 'hidden': True (solo las columnas ocultas)}
+        self.columns = columns
+        # Arreglos de NumPy por nombre, por ejemplo 'title.data', 'title.offsets', 'overview.codes', 'year'.
+        # También se pueden agregar arreglos extra calculados a partir del catálogo (se guardan con su forma)
+        self.arrays = arrays
+        # Datos extra guardados con el catálogo (por ejemplo la huella del CSV)
+        self.meta = meta or {}
+        # Mantenemos vivo el mmap mientras exista el almacén
+        self._buffer = buffer
+        self._readers = [(c['name'], self._reader(c)) for c in columns if not c.get('hidden')]
+
+    # Construye el almacén en memoria a partir de una lista de diccionarios (todos con las mismas claves).
+    # Las columnas nombradas en hidden se guardan pero no aparecen en store[i].
+    @classmethod
+    def from_records(cls, records, meta=None, hidden=()):
+        names = list(records[0].keys()) if records else []
+        columns, arrays = [], {}
+        for name in names:
+            values = [r[name] for r in records]
+            if values and all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+                column = {'name': name, 'kind': 'int'}
+                arrays[name] = np.array(values, dtype=np.int64)
+            else:
+                values = [str(v) for v in values]
+                categories = sorted(set(values))
+                if len(categories) <= MAX_CATEGORIES and len(categories) < len(values) / 2:
+                    # Pocos valores distintos: guardamos cada texto una sola vez (internado) y un código por película
+                    code_of = {v: i for i, v in enumerate(categories)}
+                    column = {'name': name, 'kind': 'cat', 'values': categories}
+                    arrays[name + '.codes'] = np.array([code_of[v] for v in values], dtype=np.uint16)
+                else:
+                    # Textos seguidos en un solo bloque y las posiciones donde empieza cada uno
+                    encoded = [v.encode('utf-8') for v in values]
+                    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+                    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+                    column = {'name': name, 'kind': 'str'}
+                    arrays[name + '.data'] = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+                    arrays[name + '.offsets'] = offsets
+            if name in hidden:
+                column['hidden'] = True
+            columns.append(column)
+        return cls(len(records), columns, arrays, meta)
+
+    # Guarda el almacén en un solo archivo. Se escribe a un archivo temporal y luego se reemplaza,
+    # así los procesos que ya tienen abierto el archivo anterior siguen leyendo una versión completa.
+    def save(self, path):
+        layout, position = [], 0
+        for name, array in self.arrays.items():
+            position = -(-position // ALIGN) * ALIGN
+            layout.append({'name': name, 'dtype': array.dtype.str, 'count': int(array.size), 'shape': list(array.shape),
+                           'offset': position})
+            position += array.nbytes
+        header = json.dumps({'length': self.length, 'columns': self.columns, 'meta': self.meta, 'arrays': layout},
+                            ensure_ascii=False).encode('utf-8')
+        data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC + len(header).to_bytes(8, 'little') + header)
+            for entry, array in zip(layout, self.arrays.values()):
+                f.seek(data_start + entry['offset'])
+                f.write(np.ascontiguousarray(array).tobytes())
+        os.replace(tmp_path, path)
+
+    # Abre un archivo guardado con save() sin copiarlo: los arreglos leen directamente del mmap
+    @classmethod
+    def open(cls, path):
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if buffer[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} no es un archivo de catálogo válido")
+        header_size = int.from_bytes(buffer[len(MAGIC):len(MAGIC) + 8], 'little')
+        header = json.loads(buffer[len(MAGIC) + 8:len(MAGIC) + 8 + header_size])
+        data_start = -(-(len(MAGIC) + 8 + header_size) // ALIGN) * ALIGN
+        arrays = {entry['name']: np.frombuffer(buffer, dtype=np.dtype(entry['dtype']), count=entry['count'],
+                                               offset=data_start + entry['offset']).reshape(entry['shape'])
+                  for entry in header['arrays']}
+        return cls(header['length'], header['columns'], arrays, header['meta'], buffer)
+
+    # Devuelve una función que lee el valor de la fila i para una columna
+    def _reader(self, column):
+        name = column['name']
+        if column['kind'] == 'int':
+            values = self.arrays[name]
+            return lambda i: int(values[i])
+        if column['kind'] == 'cat':
+            codes, categories = self.arrays[name + '.codes'], column['values']
+            return lambda i: categories[codes[i]]
+        data, offsets = self.arrays[name + '.data'], self.arrays[name + '.offsets']
+        return lambda i: data[offsets[i]:offsets[i + 1]].tobytes().decode('utf-8')
+
+    # Lee una columna completa como lista (por ejemplo para construir índices sin armar cada película).
+    # También sirve para las columnas ocultas.
+    def column(self, name):
+        column = next(c for c in self.columns if c['name'] == name)
+        if column['kind'] == 'int':
+            return self.arrays[name].tolist()
+        if column['kind'] == 'cat':
+            categories = column['values']
+            return [categories[c] for c in self.arrays[name + '.codes'].tolist()]
+        text = self.arrays[name + '.data'].tobytes()
+        offsets = self.arrays[name + '.offsets'].tolist()
+        return [text[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(self.length)]
+
+    def __len__(self):
+        return self.length
+
+    # store[i] arma el diccionario de la película i; store[inicio:fin] devuelve una lista de diccionarios
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._record(i) for i in range(*index.indices(self.length))]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("índice fuera del catálogo")
+        return self._record(index)
+
+    def _record(self, i):
+        return {name: read(i) for name, read in self._readers}
+
+    # Nombres de los campos de cada película (sin las columnas ocultas)
+    @property
+    def fields(self):
+        return [name for name, _ in self._readers]
+
+    # Arma las películas de las posiciones dadas solo con los campos pedidos (todos si fields es None),
+    # leyendo únicamente esas columnas
+    def records(self, positions, fields=None):
+        readers = self._readers if fields is None else [(name, read) for name, read in self._readers if name in fields]
+        return [{name: read(i) for name, read in readers} for i in positions]
+
+    def __iter__(self):
+        return (self._record(i) for i in range(self.length))